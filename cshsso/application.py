@@ -5,7 +5,8 @@ from flask import Flask
 
 from cshsso.config import CONFIG, CONFIG_FILE
 from cshsso.errors import ERRORS
-from cshsso.session import post_process_response
+from cshsso.reaper import start_reaper
+from cshsso.session import check_keys, post_process_response
 from cshsso.typing import ErrorHandlers, Initializers, ResponseProcessor
 
 
@@ -28,6 +29,10 @@ class Application(Flask):
         for initializer in self.initializers:
             self.before_first_request(initializer)
 
+        # Run after the initializers, which load the configuration.
+        self.before_first_request(check_keys)
+        self.before_first_request(start_reaper)
+
         self.after_request(self.post_processor)
 
     def __init_subclass__(
@@ -2,7 +2,8 @@
 
 from cshsso.convents import Convent, ConventAuth
 from cshsso.orm.models import User
-from cshsso.roles import Circle, Commission, CommissionGroup, Status
+from cshsso.roles import Circle, CommissionGroup, Status
+from cshsso.rules import convent_rule
 
 
 __all__ = [
@@ -17,6 +18,10 @@ __all__ = [
 
 INNER_OUTER = {*Circle.INNER, *Circle.OUTER}
 INNER_OUTER_GUEST = {*INNER_OUTER, *Circle.GUESTS}
+# Checks involving commissions test the user's role bitmask,
+# which is derived from the loaded commissions without a query.
+AHC_MASK = convent_rule(ConventAuth.AHC).mask
+FC_VOTE_MASK = convent_rule(ConventAuth.FC_VOTE).mask
 
 
 def is_in_inner_circle(user: User) -> bool:
@@ -61,9 +66,7 @@ def check_group(user: User, group: CommissionGroup) -> bool:
 def can_sit_ahc(user: User) -> bool:
     """Determines whether the user can sit on the AHC."""
 
-    return user.status in {Status.AH, Status.EB, Status.BBZ} or user.has_commission(
-        Commission.SENIOR
-    )
+    return user.roles & AHC_MASK != 0
 
 
 def can_vote_ahc(user: User) -> bool:
@@ -107,7 +110,7 @@ def can_sit_fc(user: User):
 def can_vote_fc(user: User) -> bool:
     """Determines whether the user can vote on the FC."""
 
-    return user.status in {Status.F, Status.EB} or user.has_commission(Commission.FM)
+    return user.roles & FC_VOTE_MASK != 0
 
 
 def check_fc(user: User, vote: bool) -> bool:
@@ -0,0 +1,328 @@
+"""Micro-benchmarks."""
+
+from argparse import ArgumentParser, Namespace
+from configparser import ConfigParser
+from datetime import date, datetime
+from io import StringIO
+from json import dumps as json_dumps
+from os import cpu_count
+from smtplib import SMTP
+from socketserver import StreamRequestHandler, ThreadingTCPServer
+from statistics import median
+from threading import Thread
+from time import perf_counter
+from timeit import repeat
+from typing import Callable
+
+from emaillib import EMail
+
+from cshsso.config import CONFIG, CONFIG_FILE
+from cshsso.email import SMTPPool, send, send_parallel
+from cshsso.orm.models import User, UserCommission
+from cshsso.passwords import HashParameters
+from cshsso.roles import Commission, Status
+from cshsso.serializer import get_serializer, orjson_dumps
+
+
+__all__ = ["run"]
+
+
+BENCHMARK_PARSER = ArgumentParser(description="Run CSHSSO micro-benchmarks.")
+BENCHMARK_PARSER.add_argument(
+    "-n", "--number", type=int, default=10000, help="calls per repetition"
+)
+BENCHMARK_PARSER.add_argument(
+    "-r", "--repeat", type=int, default=5, help="amount of repetitions"
+)
+BENCHMARKS = BENCHMARK_PARSER.add_subparsers(dest="benchmark", required=True)
+MIN_MEMORY_COST = 8192
+
+
+def measure(name: str, function: Callable[[], object], args: Namespace) -> None:
+    """Prints the best time per call of the function in microseconds."""
+
+    seconds = min(repeat(function, number=args.number, repeat=args.repeat))
+    print(f"{name:<24} {seconds / args.number * 1e6:10.2f} µs")
+
+
+def sample_user() -> User:
+    """Returns an unsaved example user."""
+
+    user = User(
+        id=1,
+        email="fuchs@slesvico-holsatia.org",
+        first_name="Hans",
+        last_name="Fuchs",
+        name_number=2,
+        status=Status.CB,
+        registered=datetime.now(),
+        admin=False,
+        bio="<p>Nothing to see here.</p>",
+        corps_list_number=1234,
+        acception=date.today(),
+        reception=date.today(),
+        verified=True,
+        locked=False,
+        failed_logins=0,
+    )
+    user.user_commissions = [
+        UserCommission(occupant=1, commission=Commission.SENIOR),
+        UserCommission(occupant=1, commission=Commission.KW),
+    ]
+    return user
+
+
+def legacy_user_to_json(user: User, *, actor: User) -> dict:
+    """Builds the user's JSON field by field like the former serializer did."""
+
+    json = {
+        "id": user.id,
+        "email": user.email,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "name_number": user.name_number,
+        "status": user.status.to_json(),
+        "registered": user.registered.isoformat(),
+        "admin": user.admin,
+        "bio": user.bio,
+        "corps_list_number": user.corps_list_number,
+        "acception": user.acception.isoformat() if user.acception else None,
+        "reception": user.reception.isoformat() if user.reception else None,
+        "commissions": [c.to_json() for c in user.commissions],
+    }
+
+    if actor.admin:
+        json.update(
+            {
+                "verified": user.verified,
+                "locked": user.locked,
+                "failed_logins": user.failed_logins,
+            }
+        )
+
+    return json
+
+
+def benchmark_serializer(args: Namespace) -> None:
+    """Compares the legacy and the compiled user serializers."""
+
+    actor = User(id=2, admin=True)
+    user = sample_user()
+    cached = sample_user()
+    cached.snapshot_id = (cached.id, 0)
+    cached._dirty.clear()
+    serializer = get_serializer(True)
+    projection = get_serializer(True, frozenset({"id", "status", "commissions"}))
+    print("JSON backend:", "stdlib" if orjson_dumps is None else "orjson")
+    measure(
+        "legacy",
+        lambda: json_dumps(legacy_user_to_json(user, actor=actor)).encode(),
+        args,
+    )
+    measure("compiled", lambda: serializer.encode(user), args)
+    measure("compiled, projected", lambda: projection.encode(user), args)
+    measure("compiled, cached", lambda: serializer.encode(cached), args)
+
+
+BENCHMARKS.add_parser(
+    "serializer", help="compare user serialization paths"
+).set_defaults(function=benchmark_serializer)
+
+
+def hash_latency(parameters: HashParameters, samples: int) -> float:
+    """Returns the median latency of hashing a password in milliseconds."""
+
+    hasher = parameters.hasher()
+    latencies = []
+
+    for _ in range(samples):
+        start = perf_counter()
+        hasher.hash("correct horse battery staple")
+        latencies.append((perf_counter() - start) * 1000)
+
+    return median(latencies)
+
+
+def autotune(
+    target: float, memory_cost: int, parallelism: int, samples: int
+) -> tuple[HashParameters, float]:
+    """Finds the most expensive Argon2 parameters within the target latency.
+
+    Memory is preferred over time, as it is the costlier resource for attackers.
+    Thus the memory cost is halved until a single pass meets the target,
+    before passes are added as long as the target is met.
+    """
+
+    parameters = HashParameters(1, memory_cost, parallelism)
+
+    while (latency := hash_latency(parameters, samples)) > target:
+        if parameters.memory_cost // 2 < MIN_MEMORY_COST:
+            break
+
+        print(f"{parameters} {latency:10.2f} ms")
+        parameters = parameters._replace(memory_cost=parameters.memory_cost // 2)
+
+    while True:
+        print(f"{parameters} {latency:10.2f} ms")
+        candidate = parameters._replace(time_cost=parameters.time_cost + 1)
+
+        if (candidate_latency := hash_latency(candidate, samples)) > target:
+            return parameters, latency
+
+        parameters, latency = candidate, candidate_latency
+
+
+def format_parameters(parameters: HashParameters, *, section: str = "argon2") -> str:
+    """Formats the parameters as a configuration section."""
+
+    config = ConfigParser()
+    config[section] = {key: str(value) for key, value in parameters._asdict().items()}
+    buffer = StringIO()
+    config.write(buffer)
+    return buffer.getvalue()
+
+
+def benchmark_argon2(args: Namespace) -> None:
+    """Recommends Argon2 parameters for the target login latency."""
+
+    print("Current:", current := HashParameters.from_config())
+    print(f"Current latency: {hash_latency(current, args.samples):.2f} ms")
+    parameters, latency = autotune(
+        args.target,
+        args.memory_cost,
+        args.parallelism
+        or max(1, (cpu_count() or 1) // CONFIG.getint("login", "workers", fallback=2)),
+        args.samples,
+    )
+    print("Recommended:", parameters)
+    print(f"Recommended latency: {latency:.2f} ms")
+
+    print(f"\nTo apply them, add to {CONFIG_FILE}:\n")
+    print(format_parameters(parameters), end="")
+
+
+ARGON2_PARSER = BENCHMARKS.add_parser(
+    "argon2", help="recommend Argon2 parameters for this host"
+)
+ARGON2_PARSER.add_argument(
+    "-t", "--target", type=float, default=250, help="target latency in milliseconds"
+)
+ARGON2_PARSER.add_argument(
+    "-m", "--memory-cost", type=int, default=65536, help="maximum memory in KiB"
+)
+ARGON2_PARSER.add_argument(
+    "-p", "--parallelism", type=int, help="threads per hash (default: CPUs/workers)"
+)
+ARGON2_PARSER.add_argument(
+    "-s", "--samples", type=int, default=5, help="hashes per measurement"
+)
+ARGON2_PARSER.set_defaults(function=benchmark_argon2)
+
+
+class SMTPSink(StreamRequestHandler):
+    """Minimal SMTP server discarding all messages."""
+
+    def reply(self, line: str) -> None:
+        """Sends a reply line."""
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self) -> None:
+        self.reply("220 localhost sink")
+
+        while line := self.rfile.readline():
+            command = line[:4].upper()
+
+            if command in {b"EHLO", b"HELO"}:
+                self.reply("250 localhost")
+            elif command == b"DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+
+                while (line := self.rfile.readline()) and line.rstrip(b"\r\n") != b".":
+                    pass
+
+                self.reply("250 OK")
+            elif command == b"QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+def start_sink() -> ThreadingTCPServer:
+    """Starts an SMTP sink on a random local port."""
+
+    ThreadingTCPServer.daemon_threads = True
+    server = ThreadingTCPServer(("127.0.0.1", 0), SMTPSink)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def measure_throughput(name: str, function: Callable[[], int]) -> None:
+    """Prints the throughput of a function returning the amount of sent emails."""
+
+    start = perf_counter()
+    sent = function()
+    seconds = perf_counter() - start
+    print(f"{name:<24} {sent / seconds:10.1f} emails/s")
+
+
+def send_unpooled(emails: list[EMail], host: str, port: int) -> int:
+    """Sends each email over its own connection like the former mailer did."""
+
+    for email in emails:
+        with SMTP(host, port) as smtp:
+            smtp.send_message(email)
+
+    return len(emails)
+
+
+def benchmark_smtp(args: Namespace) -> None:
+    """Compares SMTP sending strategies against a local sink."""
+
+    server = start_sink()
+    host, port = server.server_address
+    emails = [
+        EMail("Benchmark", "sender@localhost", f"member{index}@localhost", plain="Hi.")
+        for index in range(args.emails)
+    ]
+    pool = SMTPPool(lambda: SMTP(host, port), args.parallelism)
+
+    try:
+        measure_throughput(
+            "connection per email", lambda: send_unpooled(emails, host, port)
+        )
+        measure_throughput(
+            "pooled, one session", lambda: len(emails) if send(emails, pool=pool) else 0
+        )
+        measure_throughput(
+            "pooled, parallel",
+            lambda: send_parallel(pool, emails, args.batch_size, args.parallelism),
+        )
+    finally:
+        pool.close()
+        server.shutdown()
+        server.server_close()
+
+
+SMTP_PARSER = BENCHMARKS.add_parser(
+    "smtp", help="measure email throughput against a local SMTP sink"
+)
+SMTP_PARSER.add_argument(
+    "-e", "--emails", type=int, default=1000, help="emails per measurement"
+)
+SMTP_PARSER.add_argument(
+    "-b", "--batch-size", type=int, default=50, help="emails per session"
+)
+SMTP_PARSER.add_argument(
+    "-p", "--parallelism", type=int, default=4, help="parallel sessions"
+)
+SMTP_PARSER.set_defaults(function=benchmark_smtp)
+
+
+def run() -> int:
+    """Runs the selected benchmark."""
+
+    args = BENCHMARK_PARSER.parse_args()
+    CONFIG.read(CONFIG_FILE)
+    args.function(args)
+    return 0
@@ -0,0 +1,102 @@
+"""Bounded in-process caches."""
+
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Any, Callable, Hashable, NamedTuple, Optional
+
+
+__all__ = ["CacheInfo", "LRUCache"]
+
+
+class CacheInfo(NamedTuple):
+    """Cache statistics."""
+
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+    def to_json(self) -> dict[str, int]:
+        """Returns a JSON-ish dict."""
+        return self._asdict()
+
+
+class LRUCache:
+    """A thread-safe LRU cache with per-entry TTL."""
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Returns the cached value or the default."""
+        with self._lock:
+            try:
+                value, expires = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+
+            if expires <= monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, *, ttl: Optional[float] = None) -> None:
+        """Caches the value, evicting the least recently used entry if full."""
+        if (ttl := self.ttl if ttl is None else ttl) is None:
+            expires = float("inf")
+        else:
+            expires = monotonic() + ttl
+
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Removes the entry and returns its value."""
+        with self._lock:
+            try:
+                value, _ = self._entries.pop(key)
+            except KeyError:
+                return default
+
+            return value
+
+    def evict(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Removes all entries matching the predicate and returns their amount."""
+        with self._lock:
+            keys = [
+                key
+                for key, (value, _) in self._entries.items()
+                if predicate(key, value)
+            ]
+
+            for key in keys:
+                del self._entries[key]
+
+        return len(keys)
+
+    def clear(self) -> None:
+        """Removes all entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def info(self) -> CacheInfo:
+        """Returns the cache statistics."""
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
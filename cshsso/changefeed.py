@@ -0,0 +1,165 @@
+"""Incremental change feed of mailing lists."""
+
+from typing import Callable, NamedTuple, Optional
+
+from peewee import fn
+
+from cshsso.exceptions import CursorExpired
+from cshsso.mailinglist import RELEVANT_FIELDS, MemberState, Targets
+from cshsso.mailinglist import get_change_horizon
+from cshsso.orm.hooks import on_commissions_change, on_user_change
+from cshsso.orm.models import MailingListChange, MailingListPrune
+from cshsso.orm.models import User, UserCommission
+from cshsso.roles import Commission
+from cshsso.rules import COMMISSION_BITS, commission_mask
+
+
+__all__ = ["Delta", "load_state", "log_change", "get_delta"]
+
+
+class Delta(NamedTuple):
+    """Addresses added to and removed from a mailing list since a cursor."""
+
+    added: list[str]
+    removed: list[str]
+    cursor: int
+
+    def to_json(self) -> dict:
+        """Returns a JSON-ish dict."""
+        return self._asdict()
+
+
+def load_state(user_id: int) -> Optional[MemberState]:
+    """Loads the current state of the user from the database."""
+
+    try:
+        user = (
+            User.select(User.email, User.status)
+            .where(User.id == user_id)
+            .get()
+        )
+    except User.DoesNotExist:
+        return None
+
+    return MemberState(
+        user.email,
+        user.status,
+        frozenset(
+            commission
+            for (commission,) in UserCommission.select(UserCommission.commission)
+            .where(UserCommission.occupant == user_id)
+            .tuples()
+        ),
+    )
+
+
+def state_to_fields(prefix: str, state: Optional[MemberState]) -> dict:
+    """Returns the change log fields for the state."""
+
+    if state is None:
+        return {}
+
+    return {
+        f"{prefix}_email": state.email,
+        f"{prefix}_status": state.status,
+        f"{prefix}_commissions": commission_mask(state.commissions),
+    }
+
+
+def state_from_fields(change: MailingListChange, prefix: str) -> Optional[MemberState]:
+    """Returns the state from the change log fields."""
+
+    if (email := getattr(change, f"{prefix}_email")) is None:
+        return None
+
+    mask = getattr(change, f"{prefix}_commissions")
+    return MemberState(
+        email,
+        getattr(change, f"{prefix}_status"),
+        frozenset(
+            commission for commission, bit in COMMISSION_BITS.items() if mask & bit
+        ),
+    )
+
+
+def log_change(
+    user_id: int, old: Optional[MemberState], new: Optional[MemberState]
+) -> None:
+    """Logs the change of the user's state."""
+
+    if old == new:
+        return
+
+    MailingListChange.create(
+        user=user_id, **state_to_fields("old", old), **state_to_fields("new", new)
+    )
+
+
+@on_user_change
+def log_user_change(
+    user: User, fields: frozenset[str]
+) -> Optional[Callable[[], None]]:
+    """Logs relevant changes of the user."""
+
+    if fields.isdisjoint(RELEVANT_FIELDS):
+        return None
+
+    old = None if user.id is None else load_state(user.id)
+    return lambda: log_change(user.id, old, load_state(user.id))
+
+
+@on_commissions_change
+def log_commissions_change(user_id: int, commissions: frozenset[Commission]) -> None:
+    """Logs the change of the user's commissions."""
+
+    if (new := load_state(user_id)) is None:
+        return
+
+    log_change(
+        user_id, new._replace(commissions=new.commissions ^ commissions), new
+    )
+
+
+def get_delta(targets: Targets, since: int) -> Delta:
+    """Returns the addresses added to and removed from
+    the targets' mailing list after the given cursor.
+
+    Only settled changes are returned, so that the cursor does not pass
+    changes of transactions that are still open.
+    Raises CursorExpired if changes after the cursor have been deleted.
+    """
+
+    pruned = MailingListPrune.select(fn.MAX(MailingListPrune.until)).scalar()
+
+    if pruned is not None and since < pruned:
+        raise CursorExpired(since)
+
+    first, last, cursor = {}, {}, since
+    horizon = get_change_horizon()
+
+    for change in (
+        MailingListChange.select()
+        .where(MailingListChange.id > since)
+        .order_by(MailingListChange.id)
+    ):
+        if change.logged > horizon:
+            break
+
+        first.setdefault(change.user, state_from_fields(change, "old"))
+        last[change.user] = state_from_fields(change, "new")
+        cursor = change.id
+
+    added, removed = set(), set()
+
+    for user_id, old in first.items():
+        new = last[user_id]
+        was = old is not None and targets.matches(user_id, old)
+        now = new is not None and targets.matches(user_id, new)
+
+        if was and not (now and old.email == new.email):
+            removed.add(old.email)
+
+        if now and not (was and old.email == new.email):
+            added.add(new.email)
+
+    return Delta(sorted(added), sorted(removed - added), cursor)
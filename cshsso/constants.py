@@ -7,6 +7,7 @@ __all__ = [
     "PW_RESET_TOKEN_VALIDITY",
     "SESSION_ID",
     "SESSION_SECRET",
+    "SESSION_TOKEN",
     "SESSION_VALIDITY",
     "USER_ID",
 ]
@@ -27,5 +28,6 @@ Der CC der Slesvico-Holsatia
 PW_RESET_TOKEN_VALIDITY = timedelta(days=1)
 SESSION_ID = "cshsso-session-id"
 SESSION_SECRET = "cshsso-session-secret"
+SESSION_TOKEN = "cshsso-session-token"
 SESSION_VALIDITY = timedelta(weeks=1)
 USER_ID = "cshsso-user-id"
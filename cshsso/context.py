@@ -0,0 +1,86 @@
+"""Request context memoization."""
+
+from functools import wraps
+from typing import Any
+
+from flask import current_app, g, has_request_context
+
+from cshsso.typing import AnyCallable, Decorator
+
+
+__all__ = ["request_cached", "count_lookup", "resolutions", "check_resolutions"]
+
+
+def get_results() -> dict[str, tuple[Any, bool]]:
+    """Returns the memoized results of the current request."""
+
+    return g.setdefault("cshsso_results", {})
+
+
+def get_resolutions() -> dict[str, int]:
+    """Returns the lookup counters of the current request."""
+
+    return g.setdefault("cshsso_resolutions", {})
+
+
+def request_cached(name: str) -> Decorator:
+    """Memoizes the return value or raised exception
+    of a nullary function on the request context.
+    """
+
+    def decorator(function: AnyCallable) -> AnyCallable:
+        @wraps(function)
+        def wrapper() -> Any:
+            results = get_results()
+
+            try:
+                result, raised = results[name]
+            except KeyError:
+                try:
+                    result, raised = function(), False
+                except Exception as error:
+                    result, raised = error, True
+
+                results[name] = (result, raised)
+
+            if raised:
+                raise result
+
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def count_lookup(name: str) -> None:
+    """Counts a lookup of the named record during the current request.
+
+    Called by the underlying lookups rather than by the memoization,
+    so that lookups bypassing the memoized values are noticed.
+    """
+
+    if has_request_context():
+        counters = get_resolutions()
+        counters[name] = counters.get(name, 0) + 1
+
+
+def resolutions(name: str) -> int:
+    """Returns how often the named record has
+    been looked up during the current request.
+    """
+
+    return get_resolutions().get(name, 0)
+
+
+def check_resolutions() -> None:
+    """Fails in testing mode if any record has been
+    looked up more than once during the current request.
+    """
+
+    if not current_app.testing:
+        return
+
+    for name, count in get_resolutions().items():
+        if count > 1:
+            raise RuntimeError(f"Looked up {name} {count} times in one request.")
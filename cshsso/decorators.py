@@ -3,19 +3,25 @@
 from __future__ import annotations
 from enum import Enum
 from functools import partial, wraps
-from typing import Any
+from typing import Any, Callable, Union
 
 from cshsso.authorization import check_circle, check_convent, check_group
 from cshsso.convents import ConventAuth
 from cshsso.exceptions import NotAuthenticated, NotAuthorized
 from cshsso.localproxies import USER, SESSION
+from cshsso.orm.models import User
+from cshsso.principal import Principal, get_principal
 from cshsso.roles import Circle, CommissionGroup
+from cshsso.rules import Rule, circle_rule, convent_rule, group_rule
 from cshsso.typing import AnyCallable, Decorator, NamedFunction
 
 
 __all__ = ["authenticated", "admin", "Authorization"]
 
 
+Check = Callable[[Union[User, Principal]], bool]
+
+
 def authenticated(function: AnyCallable) -> AnyCallable:
     """Ensures authentication."""
 
@@ -37,7 +43,7 @@ def authorized(check_func: NamedFunction) -> Decorator:
     def decorator(function: AnyCallable) -> AnyCallable:
         @wraps(function)
         def wrapper(*args, **kwargs) -> Any:
-            if USER.admin or check_func(USER):
+            if (principal := get_principal(USER)).admin or check_func(principal):
                 return function(*args, **kwargs)
 
             raise NotAuthorized(check_func.name)
@@ -47,12 +53,38 @@ def authorized(check_func: NamedFunction) -> Decorator:
     return decorator
 
 
+def compile_any(mask: int) -> Check:
+    """Compiles a check whether the user has any of the roles in the mask."""
+
+    def check(user: Union[User, Principal]) -> bool:
+        return user.roles & mask != 0
+
+    return check
+
+
+def compile_all(masks: tuple[int, ...]) -> Check:
+    """Compiles a check whether the user has
+    any of the roles of each of the masks.
+    """
+
+    def check(user: Union[User, Principal]) -> bool:
+        roles = user.roles
+
+        for mask in masks:
+            if roles & mask == 0:
+                return False
+
+        return True
+
+    return check
+
+
 def admin(function: AnyCallable) -> AnyCallable:
     """Checks whether the user is an admin."""
 
     @wraps(function)
     def wrapper(*args, **kwargs) -> Any:
-        if USER.admin:
+        if get_principal(USER).admin:
             return function(*args, **kwargs)
 
         raise NotAuthorized("Admin")
@@ -82,7 +114,17 @@ class Authorization(Enum):
 
     def __call__(self, function: AnyCallable) -> AnyCallable:
         """Decorate the given function."""
-        return authorized(NamedFunction(self.name, self.value))(function)
+        return authorized(NamedFunction(self.name, self.check))(function)
+
+    @property
+    def rule(self) -> Rule:
+        """Returns the authorization rule."""
+        return RULES[self]
+
+    @property
+    def check(self) -> Check:
+        """Returns the compiled check."""
+        return compile_any(self.rule.mask)
 
     @staticmethod
     def all(*authorizations: Authorization) -> Decorator:
@@ -90,16 +132,37 @@ class Authorization(Enum):
         return authorized(
             NamedFunction(
                 " & ".join(a.name for a in authorizations),
-                lambda user: all(a.value(user) for a in authorizations),
+                compile_all(tuple(a.rule.mask for a in authorizations)),
             )
         )
 
     @staticmethod
     def any(*authorizations: Authorization) -> Decorator:
         """Combine authorization checks via any()."""
+        mask = 0
+
+        for authorization in authorizations:
+            mask |= authorization.rule.mask
+
         return authorized(
             NamedFunction(
-                " | ".join(a.name for a in authorizations),
-                lambda user: any(a.value(user) for a in authorizations),
+                " | ".join(a.name for a in authorizations), compile_any(mask)
             )
         )
+
+
+RULES = {
+    Authorization.INNER: circle_rule(Circle.INNER),
+    Authorization.OUTER: circle_rule(Circle.OUTER),
+    Authorization.GUESTS: circle_rule(Circle.GUESTS),
+    Authorization.CHARGES: group_rule(CommissionGroup.CHARGES),
+    Authorization.AHV: group_rule(CommissionGroup.AHV),
+    Authorization.AHC: convent_rule(ConventAuth.AHC),
+    Authorization.AHC_VOTE: convent_rule(ConventAuth.AHC_VOTE),
+    Authorization.CC: convent_rule(ConventAuth.CC),
+    Authorization.CC_VOTE: convent_rule(ConventAuth.CC_VOTE),
+    Authorization.FC: convent_rule(ConventAuth.FC),
+    Authorization.FC_VOTE: convent_rule(ConventAuth.FC_VOTE),
+    Authorization.FCC: convent_rule(ConventAuth.FCC),
+    Authorization.FCC_VOTE: convent_rule(ConventAuth.FCC_VOTE),
+}
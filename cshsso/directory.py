@@ -0,0 +1,151 @@
+"""Keyset-paginated member directory."""
+
+from __future__ import annotations
+from functools import reduce
+from operator import and_
+from typing import Iterable, NamedTuple, Optional
+
+from peewee import Expression
+
+from cshsso.config import CONFIG
+from cshsso.orm.fields import in_enum
+from cshsso.orm.models import User, UserCommission
+from cshsso.roles import Circle, Commission, CommissionGroup, Status
+
+
+__all__ = ["Cursor", "Page", "get_page_size", "list_users"]
+
+
+class Cursor(NamedTuple):
+    """Position of the last user of a page."""
+
+    corps_list_number: Optional[int]
+    id: int
+
+    def __str__(self) -> str:
+        if self.corps_list_number is None:
+            return f":{self.id}"
+
+        return f"{self.corps_list_number}:{self.id}"
+
+    @classmethod
+    def from_string(cls, string: str) -> Cursor:
+        """Parses a cursor from a string."""
+        corps_list_number, uid = string.split(":")
+        return cls(int(corps_list_number) if corps_list_number else None, int(uid))
+
+    @classmethod
+    def from_user(cls, user: User) -> Cursor:
+        """Returns the cursor pointing at the given user."""
+        return cls(user.corps_list_number, user.id)
+
+    @property
+    def condition(self) -> Expression:
+        """Selects users after this cursor.
+
+        MySQL sorts NULLs first in ascending order,
+        so users without a corps list number come first.
+        """
+        if self.corps_list_number is None:
+            return User.corps_list_number.is_null(False) | (
+                User.corps_list_number.is_null() & (User.id > self.id)
+            )
+
+        return (User.corps_list_number > self.corps_list_number) | (
+            (User.corps_list_number == self.corps_list_number) & (User.id > self.id)
+        )
+
+
+class Page(NamedTuple):
+    """A page of users."""
+
+    users: list[User]
+    next: Optional[Cursor]
+
+
+def get_page_size(*, section: str = "directory") -> int:
+    """Returns the configured page size."""
+
+    return CONFIG.getint(section, "page_size", fallback=50)
+
+
+def get_conditions(
+    status: Iterable[Status],
+    circles: Iterable[Circle],
+    commissions: Iterable[Commission],
+    groups: Iterable[CommissionGroup],
+) -> Iterable[Expression]:
+    """Yields conditions for the given filters.
+
+    Filters of different kinds must all match,
+    while any of the values of one filter suffices.
+    """
+
+    if status := set(status):
+        yield in_enum(User.status, status)
+
+    if circles := {status for circle in circles for status in circle}:
+        yield in_enum(User.status, circles)
+
+    commissions = set(commissions)
+    commissions_of_groups = {commission for group in groups for commission in group}
+
+    for selected in (commissions, commissions_of_groups):
+        if selected:
+            yield User.id << UserCommission.select(UserCommission.occupant).where(
+                in_enum(UserCommission.commission, selected)
+            )
+
+
+def prefetch_commissions(users: list[User]) -> list[User]:
+    """Loads the commissions of all given users in one query.
+
+    Peewee's prefetch() would use the limited page query as a subquery,
+    which MySQL does not support.
+    """
+
+    by_id = {user.id: user for user in users}
+
+    for user in users:
+        user.user_commissions = []
+
+    if not by_id:
+        return users
+
+    for user_commission in UserCommission.select().where(
+        UserCommission.occupant << set(by_id)
+    ):
+        by_id[user_commission.occupant_id].user_commissions.append(user_commission)
+
+    return users
+
+
+def list_users(
+    *,
+    status: Iterable[Status] = (),
+    circles: Iterable[Circle] = (),
+    commissions: Iterable[Commission] = (),
+    groups: Iterable[CommissionGroup] = (),
+    after: Optional[Cursor] = None,
+    page_size: Optional[int] = None,
+) -> Page:
+    """Returns a page of users ordered by corps list number and ID."""
+
+    page_size = get_page_size() if page_size is None else page_size
+    conditions = list(get_conditions(status, circles, commissions, groups))
+
+    if after is not None:
+        conditions.append(after.condition)
+
+    select = User.select().order_by(User.corps_list_number, User.id)
+
+    if conditions:
+        select = select.where(reduce(and_, conditions))
+
+    users = list(select.limit(page_size + 1))
+
+    if len(users) <= page_size:
+        return Page(prefetch_commissions(users), None)
+
+    users = prefetch_commissions(users[:page_size])
+    return Page(users, Cursor.from_user(users[-1]))
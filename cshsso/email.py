@@ -1,29 +1,263 @@
 """Sending emails."""
 
-from functools import cache
-from typing import Iterable
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import cache, partial
+from logging import getLogger
+from smtplib import SMTP, SMTP_SSL
+from smtplib import SMTPException
+from smtplib import SMTPRecipientsRefused
+from smtplib import SMTPResponseException
+from smtplib import SMTPServerDisconnected
+from threading import BoundedSemaphore, Lock
+from time import monotonic
+from typing import Callable, Iterable, Iterator, Optional
 
-from emaillib import EMail, Mailer
+from emaillib import EMail
 
 from cshsso.config import CONFIG
+from cshsso.mailinglist import Target, get_emails
 
 
-__all__ = ["send"]
+__all__ = [
+    "CONNECTION_ERRORS",
+    "MESSAGE_ERRORS",
+    "SMTPPool",
+    "connect",
+    "get_smtp_pool",
+    "send",
+    "send_parallel",
+    "announce",
+]
+
+
+LOGGER = getLogger("cshsso")
+# Errors after which the connection must be replaced.
+# Timed out reads leave the session in an unknown state.
+# SMTPException is a subclass of OSError, so these must be caught first.
+CONNECTION_ERRORS = (SMTPServerDisconnected, ConnectionError, TimeoutError)
+# Errors rejecting a single message, after which the session can be reused.
+MESSAGE_ERRORS = (SMTPRecipientsRefused, SMTPResponseException)
+
+
+def connect(*, section: str = "email") -> SMTP:
+    """Opens an SMTP connection as per the configuration.
+
+    Uses STARTTLS if offered and logs in if credentials are configured.
+    """
+
+    server = CONFIG.get(section, "server", fallback="localhost")
+    port = CONFIG.getint(section, "port", fallback=25)
+    timeout = CONFIG.getfloat(section, "timeout", fallback=30)
+
+    if CONFIG.getboolean(section, "ssl", fallback=False):
+        smtp = SMTP_SSL(server, port, timeout=timeout)
+    else:
+        smtp = SMTP(server, port, timeout=timeout)
+        smtp.ehlo()
+
+        if smtp.has_extn("starttls"):
+            smtp.starttls()
+            smtp.ehlo()
+
+    if login := CONFIG.get(section, "login", fallback=None):
+        smtp.login(login, CONFIG.get(section, "passwd"))
+
+    return smtp
+
+
+def close(smtp: SMTP) -> None:
+    """Closes the connection, ignoring errors of dead connections."""
+
+    try:
+        smtp.quit()
+    except (SMTPException, OSError):
+        smtp.close()
+
+
+def is_healthy(smtp: SMTP) -> bool:
+    """Checks whether the server still responds on the connection."""
+
+    try:
+        code, _ = smtp.noop()
+    except (SMTPException, OSError):
+        return False
+
+    return code == 250
+
+
+class SMTPPool:
+    """Pool of authenticated SMTP connections.
+
+    Idle connections are closed after the idle timeout and are
+    checked with NOOP before reuse, so that connections dropped
+    by the server are replaced transparently.
+    At most size connections are open at any time.
+    """
+
+    def __init__(
+        self, factory: Callable[[], SMTP], size: int = 4, idle_timeout: float = 60
+    ):
+        self.factory = factory
+        self.idle_timeout = idle_timeout
+        self._idle: list[tuple[SMTP, float]] = []
+        self._slots = BoundedSemaphore(size)
+        self._lock = Lock()
+
+    def _checkout(self) -> SMTP:
+        """Returns a healthy idle connection or a new one."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+
+                smtp, released = self._idle.pop()
+
+            if monotonic() - released < self.idle_timeout and is_healthy(smtp):
+                return smtp
+
+            close(smtp)
+
+        return self.factory()
+
+    @contextmanager
+    def connection(self) -> Iterator[SMTP]:
+        """Borrows a connection, waiting while all connections are in use.
+
+        The connection is returned to the pool unless an error escapes.
+        """
+        with self._slots:
+            smtp = self._checkout()
+
+            try:
+                yield smtp
+            except BaseException:
+                close(smtp)
+                raise
+
+            with self._lock:
+                self._idle.append((smtp, monotonic()))
+
+    def close(self) -> None:
+        """Closes all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+
+        for smtp, _ in idle:
+            close(smtp)
 
 
 @cache
-def get_mailer(*, section: str = "email") -> Mailer:
-    """Returns the mailer as per the configuration."""
-
-    return Mailer(
-        CONFIG.get(section, "server"),
-        CONFIG.getint(section, "port"),
-        CONFIG.get(section, "login"),
-        CONFIG.get(section, "passwd"),
+def get_smtp_pool(*, section: str = "email") -> SMTPPool:
+    """Returns the SMTP connection pool as per the configuration."""
+
+    return SMTPPool(
+        partial(connect, section=section),
+        CONFIG.getint(section, "pool_size", fallback=4),
+        CONFIG.getfloat(section, "idle_timeout", fallback=60),
     )
 
 
-def send(emails: Iterable[EMail]) -> None:
-    """Sends the provided emails."""
+def send_message(smtp: SMTP, email: EMail) -> bool:
+    """Sends a single email, logging its rejection."""
+
+    try:
+        smtp.send_message(email)
+    except MESSAGE_ERRORS as error:
+        LOGGER.error("Email to %s rejected: %s", email["To"], error)
+        return False
+
+    return True
+
+
+def send_batch(pool: SMTPPool, emails: list[EMail]) -> int:
+    """Sends the emails over one session and returns the amount sent.
+
+    Rejected emails are skipped. A dropped connection is replaced,
+    unless the replacement drops before sending anything either.
+    """
+
+    sent = index = 0
+    retried = False
+
+    while True:
+        start = index
+
+        try:
+            with pool.connection() as smtp:
+                while index < len(emails):
+                    sent += send_message(smtp, emails[index])
+                    index += 1
+
+            return sent
+        except CONNECTION_ERRORS as error:
+            LOGGER.warning("SMTP connection lost: %s", error)
+        except (SMTPException, OSError) as error:
+            LOGGER.error("Could not connect to mail server: %s", error)
+            break
+
+        if retried and index == start:
+            break
 
-    return get_mailer().send(emails)
+        retried = True
+
+    LOGGER.error("Could not send %i emails.", len(emails) - index)
+    return sent
+
+
+def send(emails: Iterable[EMail], *, pool: Optional[SMTPPool] = None) -> bool:
+    """Sends the provided emails over one session.
+
+    Returns True if all emails were sent.
+    """
+
+    emails = list(emails)
+    return send_batch(pool or get_smtp_pool(), emails) == len(emails)
+
+
+def send_parallel(
+    pool: SMTPPool, emails: list[EMail], batch_size: int, parallelism: int
+) -> int:
+    """Sends batches of the emails over at most parallelism sessions.
+
+    Returns the amount of emails sent.
+    """
+
+    with ThreadPoolExecutor(parallelism, thread_name_prefix="smtp") as executor:
+        return sum(
+            executor.map(
+                partial(send_batch, pool),
+                [
+                    emails[index : index + batch_size]
+                    for index in range(0, len(emails), batch_size)
+                ],
+            )
+        )
+
+
+def announce(
+    subject: str,
+    sender: str,
+    *targets: Target,
+    plain: Optional[str] = None,
+    html: Optional[str] = None,
+    pool: Optional[SMTPPool] = None,
+    section: str = "email",
+) -> int:
+    """Sends an announcement to each member of the targets, e.g. whole circles.
+
+    The recipients are split into batches sent over at most
+    the configured amount of parallel sessions.
+    Returns the amount of emails sent.
+    """
+
+    return send_parallel(
+        pool or get_smtp_pool(section=section),
+        [
+            EMail(subject, sender, recipient, plain=plain, html=html)
+            for recipient in get_emails(*targets)
+        ],
+        CONFIG.getint(section, "batch_size", fallback=50),
+        CONFIG.getint(section, "parallelism", fallback=2),
+    )
@@ -5,10 +5,13 @@ from recaptcha import VerificationError
 
 from wsgilib import JSONMessage
 
+from cshsso.exceptions import CursorExpired
+from cshsso.exceptions import InvalidFields
 from cshsso.exceptions import InvalidPassword
 from cshsso.exceptions import NotAuthenticated
 from cshsso.exceptions import NotAuthorized
 from cshsso.exceptions import NotLoggedIn
+from cshsso.exceptions import Overloaded
 from cshsso.orm.models import User, Session
 
 
@@ -16,6 +19,12 @@ __all__ = ["ERRORS"]
 
 
 ERRORS = {
+    CursorExpired: lambda error: JSONMessage(
+        "Changes expired. Please resynchronize.", cursor=error.cursor, status=410
+    ),
+    InvalidFields: lambda error: JSONMessage(
+        "Invalid fields.", fields=sorted(error.fields), status=400
+    ),
     InvalidPassword: lambda _: ("Invalid password.", 400),
     NotAuthenticated: lambda error: JSONMessage(
         "Not authenticated.",
@@ -28,6 +37,10 @@ ERRORS = {
         "Not authorized.", target=error.target, status=403
     ),
     NotLoggedIn: lambda _: ("Not logged in.", 401),
+    Overloaded: lambda error: (
+        JSONMessage("Service temporarily overloaded.", status=503),
+        {"Retry-After": str(error.retry_after)},
+    ),
     Session.DoesNotExist: lambda _: ("No such session.", 404),
     User.DoesNotExist: lambda _: ("No such user.", 404),
     VerificationError: lambda error: (jsonify(error.json), 400),
@@ -1,7 +1,31 @@
 """Common exceptions."""
 
 
-__all__ = ["InvalidPassword", "NotAuthenticated", "NotAuthorized", "NotLoggedIn"]
+__all__ = [
+    "CursorExpired",
+    "InvalidFields",
+    "InvalidPassword",
+    "NotAuthenticated",
+    "NotAuthorized",
+    "NotLoggedIn",
+    "Overloaded",
+]
+
+
+class CursorExpired(Exception):
+    """Indicates that changes after a cursor are no longer available."""
+
+    def __init__(self, cursor: int):
+        super().__init__(cursor)
+        self.cursor = cursor
+
+
+class InvalidFields(Exception):
+    """Indicates that unknown fields were requested."""
+
+    def __init__(self, fields: set[str]):
+        super().__init__(fields)
+        self.fields = fields
 
 
 class InvalidPassword(Exception):
@@ -28,3 +52,11 @@ class NotAuthorized(Exception):
 
 class NotLoggedIn(Exception):
     """Indicates that the user is not logged in."""
+
+
+class Overloaded(Exception):
+    """Indicates that the server cannot currently process the request."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
@@ -0,0 +1,48 @@
+"""Configurable Argon2 password hashing."""
+
+from __future__ import annotations
+from functools import cache
+from typing import NamedTuple
+
+from argon2 import PasswordHasher
+
+from cshsso.config import CONFIG
+
+
+__all__ = ["HashParameters", "get_hasher"]
+
+
+class HashParameters(NamedTuple):
+    """Argon2 cost parameters."""
+
+    time_cost: int
+    memory_cost: int
+    parallelism: int
+
+    @classmethod
+    def from_config(cls, section: str = "argon2") -> HashParameters:
+        """Reads the parameters from the configuration.
+
+        Missing parameters default to those of argon2-cffi.
+        """
+        default = PasswordHasher()
+        return cls(
+            CONFIG.getint(section, "time_cost", fallback=default.time_cost),
+            CONFIG.getint(section, "memory_cost", fallback=default.memory_cost),
+            CONFIG.getint(section, "parallelism", fallback=default.parallelism),
+        )
+
+    def hasher(self) -> PasswordHasher:
+        """Returns a password hasher using these parameters."""
+        return PasswordHasher(
+            time_cost=self.time_cost,
+            memory_cost=self.memory_cost,
+            parallelism=self.parallelism,
+        )
+
+
+@cache
+def get_hasher() -> PasswordHasher:
+    """Returns the password hasher as per the configuration."""
+
+    return HashParameters.from_config().hasher()
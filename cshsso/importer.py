@@ -0,0 +1,220 @@
+"""Bulk import of users."""
+
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from csv import DictReader
+from json import load
+from logging import DEBUG, INFO, basicConfig, getLogger
+from os import cpu_count
+from pathlib import Path
+from time import perf_counter
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from peewee import DataError, IntegrityError
+from peeweeplus import PasswordTooShort
+
+from cshsso.config import CONFIG, CONFIG_FILE
+from cshsso.functions import date_or_none
+from cshsso.orm.models import DATABASE, User, UserCommission
+from cshsso.passwords import hash_password
+from cshsso.roles import Commission, Status
+
+
+__all__ = ["ImportRecord", "ImportStats", "read_records", "import_users", "run"]
+
+
+LOGGER = getLogger("cshsso-import")
+IMPORT_PARSER = ArgumentParser(description="Import CSHSSO users.")
+IMPORT_PARSER.add_argument("file", type=Path, help="CSV or JSON file of users")
+IMPORT_PARSER.add_argument(
+    "-f", "--format", choices=["csv", "json"], help="file format (default: suffix)"
+)
+IMPORT_PARSER.add_argument(
+    "-b", "--batch-size", type=int, default=100, help="users per transaction"
+)
+IMPORT_PARSER.add_argument(
+    "-w", "--workers", type=int, help="password hashing processes"
+)
+IMPORT_PARSER.add_argument(
+    "-V", "--verified", action="store_true", help="mark users as verified"
+)
+IMPORT_PARSER.add_argument(
+    "-n", "--dry-run", action="store_true", help="roll back all changes"
+)
+IMPORT_PARSER.add_argument("-v", "--verbose", action="store_true", help="be gassy")
+
+
+class ImportRecord(NamedTuple):
+    """A parsed user record."""
+
+    row: int
+    user: User
+    passwd: str
+    commissions: frozenset[Commission]
+
+
+class ImportStats(NamedTuple):
+    """Statistics of an import run."""
+
+    read: int
+    imported: int
+    failed: int
+    hashing: float
+    inserting: float
+
+    def __str__(self) -> str:
+        seconds = self.hashing + self.inserting
+        rate = self.imported / seconds if seconds else 0
+        return (
+            f"Imported {self.imported} of {self.read} users ({self.failed} failed)"
+            f" in {seconds:.3f} seconds ({self.hashing:.3f} hashing,"
+            f" {self.inserting:.3f} inserting, {rate:.1f} users/s)."
+        )
+
+
+def read_records(file: Path, format: str) -> list[dict]:
+    """Reads user records from a CSV or JSON file.
+
+    CSV commissions are separated by whitespace.
+    """
+
+    with file.open("r", encoding="utf-8") as stream:
+        if format == "json":
+            return load(stream)
+
+        return [
+            {
+                **{key: value or None for key, value in record.items()},
+                "commissions": (record.get("commissions") or "").split(),
+            }
+            for record in DictReader(stream)
+        ]
+
+
+def parse_record(row: int, json: dict, *, verified: bool) -> ImportRecord:
+    """Parses a user record in the format of register.user_from_json().
+
+    The password is validated like on assignment to
+    User.passwd, but stored in the record and hashed separately.
+    """
+
+    User.passwd.validate(json["passwd"])
+    return ImportRecord(
+        row,
+        User(
+            email=json["email"],
+            first_name=json["first_name"],
+            last_name=json["last_name"],
+            status=Status[json["status"]],
+            name_number=json.get("name_number"),
+            corps_list_number=json.get("corps_list_number"),
+            acception=date_or_none(json.get("acception")),
+            reception=date_or_none(json.get("reception")),
+            verified=verified,
+        ),
+        json["passwd"],
+        frozenset(Commission[name] for name in json.get("commissions") or ()),
+    )
+
+
+def parse_records(
+    records: Iterable[dict], *, verified: bool
+) -> Iterator[ImportRecord]:
+    """Parses the records, logging invalid ones."""
+
+    for row, json in enumerate(records, start=1):
+        try:
+            yield parse_record(row, json, verified=verified)
+        except KeyError as error:
+            LOGGER.error("Row %i: Missing or invalid value %s.", row, error)
+        except PasswordTooShort:
+            LOGGER.error("Row %i: Password is too short.", row)
+        except (TypeError, ValueError) as error:
+            LOGGER.error("Row %i: %s", row, error)
+
+
+def insert_record(record: ImportRecord) -> bool:
+    """Inserts the user and its commissions in a savepoint."""
+
+    try:
+        with DATABASE.atomic():
+            record.user.save()
+
+            for commission in record.commissions:
+                UserCommission(occupant=record.user, commission=commission).save()
+    except IntegrityError as error:
+        LOGGER.error("Row %i: %s", record.row, error)
+        return False
+    except (DataError, ValueError) as error:
+        LOGGER.error("Row %i: Invalid value(s): %s", record.row, error)
+        return False
+
+    LOGGER.debug("Row %i: Imported user %i.", record.row, record.user.id)
+    return True
+
+
+def insert_batch(batch: list[ImportRecord], *, dry_run: bool) -> int:
+    """Inserts a batch of records in one transaction."""
+
+    with DATABASE.atomic() as transaction:
+        imported = sum(insert_record(record) for record in batch)
+
+        if dry_run:
+            transaction.rollback()
+
+    return imported
+
+
+def import_users(
+    records: list[dict],
+    *,
+    batch_size: int = 100,
+    workers: Optional[int] = None,
+    verified: bool = False,
+    dry_run: bool = False,
+) -> ImportStats:
+    """Imports users, hashing their passwords on a process pool."""
+
+    parsed = list(parse_records(records, verified=verified))
+    workers = workers or cpu_count() or 1
+    start = perf_counter()
+
+    with ProcessPoolExecutor(workers) as executor:
+        hashes = executor.map(
+            hash_password,
+            [record.passwd for record in parsed],
+            chunksize=max(1, len(parsed) // (workers * 4)),
+        )
+
+        for record, passwd_hash in zip(parsed, hashes):
+            record.user.passwd = User.passwd.python_value(passwd_hash)
+
+    hashed = perf_counter()
+    imported = sum(
+        insert_batch(parsed[index : index + batch_size], dry_run=dry_run)
+        for index in range(0, len(parsed), batch_size)
+    )
+    return ImportStats(
+        len(records),
+        imported,
+        len(records) - imported,
+        hashed - start,
+        perf_counter() - hashed,
+    )
+
+
+def run() -> int:
+    """Imports users from a file."""
+
+    args = IMPORT_PARSER.parse_args()
+    basicConfig(level=DEBUG if args.verbose else INFO)
+    CONFIG.read(CONFIG_FILE)
+    stats = import_users(
+        read_records(args.file, args.format or args.file.suffix.lstrip(".").lower()),
+        batch_size=args.batch_size,
+        workers=args.workers,
+        verified=args.verified,
+        dry_run=args.dry_run,
+    )
+    LOGGER.info("%s%s", "Dry run: " if args.dry_run else "", stats)
+    return 0 if stats.failed == 0 else 2
@@ -2,19 +2,31 @@
 
 from argparse import ArgumentParser
 from logging import DEBUG, INFO, basicConfig, getLogger
+from typing import Iterator
+
+from peewee import Database, Model
+from playhouse.migrate import SchemaMigrator, migrate
 
 from cshsso.config import CONFIG, CONFIG_FILE
 from cshsso.orm import MODELS
 
 
-__all__ = ["setup_db"]
+__all__ = ["setup_db", "migrate_db", "upgrade"]
 
 
+LOGGER = getLogger("cshsso-setup-db")
 DB_SETUP_PARSER = ArgumentParser(description="Setup CSHSSO database.")
 DB_SETUP_PARSER.add_argument(
     "-s", "--safe", action="store_true", help="ignore existing database tables"
 )
 DB_SETUP_PARSER.add_argument("-v", "--verbose", action="store_true", help="be gassy")
+DB_MIGRATE_PARSER = ArgumentParser(
+    description="Add missing tables, columns and indexes to the CSHSSO database."
+)
+DB_MIGRATE_PARSER.add_argument(
+    "-n", "--dry-run", action="store_true", help="only list the missing items"
+)
+DB_MIGRATE_PARSER.add_argument("-v", "--verbose", action="store_true", help="be gassy")
 
 
 def setup_db() -> int:
@@ -22,14 +34,88 @@ def setup_db() -> int:
 
     args = DB_SETUP_PARSER.parse_args()
     basicConfig(level=DEBUG if args.verbose else INFO)
-    logger = getLogger("cshsso-setup-db")
     CONFIG.read(CONFIG_FILE)
 
     for model in MODELS:
         try:
             model.create_table(safe=args.safe)
         except Exception as error:
-            logger.error(str(error))
+            LOGGER.error(str(error))
             return 1
 
     return 0
+
+
+def get_indexes(model: Model) -> Iterator[tuple[tuple[str, ...], bool]]:
+    """Yields the columns and uniqueness of the model's secondary indexes."""
+
+    for field in model._meta.sorted_fields:
+        if (field.index or field.unique) and not field.primary_key:
+            yield (field.column_name,), field.unique
+
+    for names, unique in model._meta.indexes:
+        yield tuple(model._meta.fields[name].column_name for name in names), unique
+
+
+def upgrade(database: Database, *, dry_run: bool = False) -> list[str]:
+    """Adds missing tables, columns and indexes of the models.
+
+    Existing columns and indexes are left unchanged.
+    Returns descriptions of the changes.
+    """
+
+    changes = []
+
+    for model in MODELS:
+        table, schema = model._meta.table_name, model._meta.schema
+        migrator = SchemaMigrator.from_database(database, schema=schema)
+
+        if not database.table_exists(table, schema=schema):
+            changes.append(f"Create table {table}.")
+
+            if not dry_run:
+                model.create_table()
+
+            continue
+
+        existing_columns = {
+            column.name for column in database.get_columns(table, schema)
+        }
+        existing_indexes = {
+            tuple(index.columns) for index in database.get_indexes(table, schema)
+        }
+
+        for field in model._meta.sorted_fields:
+            if field.column_name not in existing_columns:
+                changes.append(f"Add column {table}.{field.column_name}.")
+
+                if not dry_run:
+                    migrate(migrator.add_column(table, field.column_name, field))
+
+        for columns, unique in get_indexes(model):
+            if columns not in existing_indexes:
+                changes.append(f"Add index on {table}({', '.join(columns)}).")
+
+                if not dry_run:
+                    migrate(migrator.add_index(table, columns, unique))
+
+    return changes
+
+
+def migrate_db() -> int:
+    """Upgrade the databases of previous versions."""
+
+    args = DB_MIGRATE_PARSER.parse_args()
+    basicConfig(level=DEBUG if args.verbose else INFO)
+    CONFIG.read(CONFIG_FILE)
+
+    try:
+        changes = upgrade(MODELS[0]._meta.database, dry_run=args.dry_run)
+    except Exception as error:
+        LOGGER.error(str(error))
+        return 1
+
+    for change in changes:
+        LOGGER.info(change)
+
+    return 0
@@ -1,14 +1,16 @@
 """Local proxies."""
 
-from functools import partial
-
+from flask import request
 from werkzeug.local import LocalProxy
 
-from cshsso.orm.functions import get_current_user
+from cshsso.constants import USER_ID
+from cshsso.context import request_cached
+from cshsso.orm.functions import get_current_user, get_session_user, get_user
+from cshsso.orm.models import User
 from cshsso.session import get_session
 
 
-__all__ = ["SESSION", "USER"]
+__all__ = ["SESSION", "ACTOR", "USER", "TARGET"]
 
 
 class ModelProxy(LocalProxy):
@@ -24,5 +26,42 @@ class ModelProxy(LocalProxy):
         return self._get_current_object()._pk
 
 
+@request_cached("actor")
+def session_user() -> User:
+    """Returns the full record of the session's user, resolved once per request.
+
+    Use this rather than SESSION.user to check permissions of the actor,
+    since stateless sessions only carry possibly outdated token claims.
+    """
+
+    return get_session_user(SESSION)
+
+
+@request_cached("user")
+def current_user() -> User:
+    """Returns the current user, resolved once per request."""
+
+    return get_current_user(ACTOR)
+
+
+@request_cached("target")
+def target_user() -> User:
+    """Returns the user to act on, which non-admins may
+    select as well, resolved once per request.
+    """
+
+    try:
+        uid = int(request.cookies[USER_ID])
+    except KeyError:
+        uid = None
+
+    if ACTOR.admin or uid is None or uid == ACTOR.id:
+        return USER._get_current_object()
+
+    return get_user(uid)
+
+
 SESSION = ModelProxy(get_session)
-USER = ModelProxy(partial(get_current_user, SESSION))
+ACTOR = ModelProxy(session_user)
+USER = ModelProxy(current_user)
+TARGET = ModelProxy(target_user)
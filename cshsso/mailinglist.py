@@ -1,61 +1,397 @@
 """Mailing list creation."""
 
-from functools import partial
-from typing import Iterator, Union
+from __future__ import annotations
+from functools import cache, partial, reduce
+from datetime import datetime, timedelta
+from hashlib import sha256
+from operator import or_
+from threading import Lock
+from typing import Any, Callable, Iterable, Iterator, NamedTuple, Optional, Union
 
-from peewee import Expression, ModelSelect
+from peewee import Expression, ModelSelect, Value, fn
 
-from cshsso.orm.models import User, UserCommission
+from cshsso.cache import CacheInfo, LRUCache
+from cshsso.config import CONFIG
+from cshsso.orm.fields import in_enum
+from cshsso.orm.hooks import on_commissions_change, on_user_change
+from cshsso.orm.models import DATABASE, MailingListChange, User, UserCommission
 from cshsso.roles import Status, Circle, Commission, CommissionGroup
+from cshsso.serializer import dumps
 
 
-__all__ = ["get_users", "get_emails"]
+__all__ = [
+    "MemberState",
+    "Targets",
+    "MailingList",
+    "get_users",
+    "get_emails",
+    "get_mailing_list",
+    "get_mailing_lists",
+    "get_change_horizon",
+    "get_change_cursor",
+    "mailing_list_cache_info",
+]
 
 
 Target = Union[Status, Circle, Commission, CommissionGroup, User, int]
+TARGET_TYPES = {
+    "status": Status,
+    "circle": Circle,
+    "commission": Commission,
+    "group": CommissionGroup,
+}
+RELEVANT_FIELDS = frozenset({"email", "status"})
 
 
-def get_users(*targets: Target) -> ModelSelect:
-    """Yields email addresses."""
+class MemberState(NamedTuple):
+    """Properties of a user relevant to mailing lists."""
+
+    email: str
+    status: Status
+    commissions: frozenset[Commission]
+
+    @classmethod
+    def from_user(cls, user: User) -> MemberState:
+        """Returns the state of the given user."""
+        return cls(user.email, user.status, frozenset(user.commissions))
+
+
+class Targets(NamedTuple):
+    """Canonical set of mailing list targets.
+
+    Circles are resolved to their status and
+    commission groups to their commissions.
+    """
+
+    status: frozenset[Status] = frozenset()
+    commissions: frozenset[Commission] = frozenset()
+    users: frozenset[int] = frozenset()
+
+    def __str__(self) -> str:
+        return ",".join(
+            sorted(
+                # .name would return the role's display name of the tuple.
+                [f"status:{status._name_}" for status in self.status]
+                + [
+                    f"commission:{commission._name_}"
+                    for commission in self.commissions
+                ]
+                + [f"user:{user}" for user in self.users]
+            )
+        )
+
+    @classmethod
+    def from_targets(cls, targets: Iterable[Target]) -> Targets:
+        """Canonicalizes the given targets."""
+        status, commissions, users = set(), set(), set()
+
+        for target in targets:
+            if isinstance(target, Status):
+                status.add(target)
+            elif isinstance(target, Circle):
+                status |= target
+            elif isinstance(target, Commission):
+                commissions.add(target)
+            elif isinstance(target, CommissionGroup):
+                commissions |= target
+            elif isinstance(target, User):
+                users.add(target.id)
+            elif isinstance(target, int):
+                users.add(target)
+
+        return cls(frozenset(status), frozenset(commissions), frozenset(users))
+
+    @classmethod
+    def parse(cls, string: str) -> Targets:
+        """Parses targets like "circle:INNER,group:CHARGES,user:42".
+
+        Raises ValueError on invalid targets.
+        """
+        targets = []
+
+        for target in filter(None, map(str.strip, string.split(","))):
+            kind, _, name = target.partition(":")
+
+            if kind == "user":
+                targets.append(int(name))
+                continue
+
+            try:
+                targets.append(TARGET_TYPES[kind][name])
+            except KeyError:
+                raise ValueError(f"Invalid target: {target}") from None
+
+        return cls.from_targets(targets)
+
+    @property
+    def condition(self) -> Expression:
+        """Selects users matching any of the targets.
+
+        Commissions are matched by a subquery instead of a join,
+        so that each user is selected at most once and targeting
+        by status does not touch the commissions at all.
+        """
+        conditions = []
+
+        if self.status:
+            conditions.append(in_enum(User.status, set(self.status)))
+
+        if self.commissions:
+            conditions.append(
+                User.id
+                << UserCommission.select(UserCommission.occupant).where(
+                    in_enum(UserCommission.commission, set(self.commissions))
+                )
+            )
+
+        if self.users:
+            conditions.append(User.id << set(self.users))
+
+        if not conditions:
+            return Value(False)
+
+        return reduce(or_, conditions)
+
+    def matches(self, user_id: int, state: MemberState) -> bool:
+        """Checks whether the user with the given state is targeted."""
+        return (
+            state.status in self.status
+            or user_id in self.users
+            or not self.commissions.isdisjoint(state.commissions)
+        )
+
+
+def get_change_horizon(*, section: str = "mailinglist") -> datetime:
+    """Returns the time up to which logged changes are considered committed.
+
+    IDs of changes are assigned on insert, but become visible on commit.
+    Reading only changes older than the configured settle time prevents
+    cursors from passing changes whose transaction is still open.
+    """
+
+    return datetime.now() - timedelta(
+        seconds=CONFIG.getfloat(section, "change_settle", fallback=60)
+    )
+
+
+def get_change_cursor() -> int:
+    """Returns the ID of the latest settled change."""
 
     return (
-        User.select(User, UserCommission)
-        .join(UserCommission)
-        .where(get_condition(targets))
+        MailingListChange.select(fn.MAX(MailingListChange.id))
+        .where(MailingListChange.logged <= get_change_horizon())
+        .scalar()
+        or 0
     )
 
 
-def get_emails(*targets: Target) -> Iterator[str]:
-    """Yields email addresses for the given targets."""
+def get_changes_after(cursor: int) -> tuple[int, int]:
+    """Returns the latest ID and the amount of visible changes after the cursor.
 
-    for user in get_users(*targets):
-        yield user.email
+    Both only stay the same as long as no further change becomes visible,
+    including changes of transactions committed after later ones.
+    """
 
+    latest, amount = (
+        MailingListChange.select(fn.MAX(MailingListChange.id), fn.COUNT())
+        .where(MailingListChange.id > cursor)
+        .tuples()
+        .get()
+    )
+    return latest or cursor, amount
 
-def get_condition(targets: tuple[Target, ...]) -> Expression:
-    """Returns a select expression."""
 
-    status = {status for status in targets if isinstance(status, Status)}
+class MailingList(NamedTuple):
+    """A materialized mailing list."""
+
+    emails: tuple[str, ...]
+    members: frozenset[int]
+    etag: str
+    json: bytes
+    cursor: int
+    # Changes after the cursor visible before loading.
+    changes: tuple[int, int]
+
+    @property
+    def is_current(self) -> bool:
+        """Checks whether no changes became visible since loading,
+        including changes made by other processes.
+        """
+        return get_changes_after(self.cursor) == self.changes
+
+    @classmethod
+    def load(cls, targets: Targets) -> MailingList:
+        """Loads the mailing list sorted by email address.
+
+        The cursor points to the last settled change before loading.
+        Changes after it may already be included in the list.
+        """
+        cursor = get_change_cursor()
+        changes = get_changes_after(cursor)
+        members, emails = set(), []
+
+        for user_id, email in (
+            User.select(User.id, User.email)
+            .where(targets.condition)
+            .order_by(User.email)
+            .tuples()
+        ):
+            members.add(user_id)
+            emails.append(email)
+
+        return cls(
+            tuple(emails),
+            frozenset(members),
+            sha256("\n".join(emails).encode()).hexdigest(),
+            dumps(emails),
+            cursor,
+            changes,
+        )
+
+
+class MailingListCache:
+    """LRU cache of materialized mailing lists.
+
+    Lists loaded while an invalidation happened are not cached.
+    Lists are invalidated precisely by changes made in this process
+    and reloaded on any change logged by other processes.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.lists = LRUCache(maxsize, ttl)
+        self.generation = 0
+        self._lock = Lock()
 
-    for circle in filter(partial(isinstance, class_or_tuple=Circle), targets):
-        status |= set(circle)
+    def get(self, targets: Targets) -> MailingList:
+        """Returns the mailing list for the given targets."""
+        if (mailing_list := self.lists.get(targets)) is not None:
+            if mailing_list.is_current:
+                return mailing_list
 
-    commissions = {comm for comm in targets if isinstance(comm, Commission)}
+        generation = self.generation
+        mailing_list = MailingList.load(targets)
 
-    for cgroup in filter(partial(isinstance, class_or_tuple=CommissionGroup), targets):
-        commissions |= set(cgroup)
+        with self._lock:
+            if generation == self.generation:
+                self.lists.set(targets, mailing_list)
 
-    user_ids = {user.id for user in targets if isinstance(user, User)}
-    user_ids |= {user_id for user_id in targets if isinstance(user_id, int)}
-    condition = False
+        return mailing_list
 
-    if status:
-        condition |= User.status << status
+    def invalidate(self, predicate: Callable[[Targets, MailingList], bool]) -> None:
+        """Removes the mailing lists matching the predicate."""
+        with self._lock:
+            self.generation += 1
+            self.lists.evict(predicate)
 
-    if commissions:
-        condition |= UserCommission.commission << commissions
 
-    if user_ids:
-        condition |= User.id << user_ids
+@cache
+def get_mailing_lists(*, section: str = "mailinglist") -> MailingListCache:
+    """Returns the mailing list cache."""
+
+    return MailingListCache(
+        CONFIG.getint(section, "cache_size", fallback=64),
+        CONFIG.getfloat(section, "cache_ttl", fallback=3600),
+    )
+
+
+def get_mailing_list(*targets: Target) -> MailingList:
+    """Returns the materialized mailing list for the given targets."""
+
+    return get_mailing_lists().get(Targets.from_targets(targets))
+
+
+def mailing_list_cache_info() -> CacheInfo:
+    """Returns statistics of the mailing list cache."""
+
+    return get_mailing_lists().lists.info()
+
+
+def invalidate_member(user: User) -> None:
+    """Invalidates the mailing lists the user left or joined."""
+
+    state = MemberState.from_user(user)
+    get_mailing_lists().invalidate(
+        lambda targets, mailing_list: user.id in mailing_list.members
+        or targets.matches(user.id, state)
+    )
+
+
+@on_user_change
+def invalidate_user(
+    user: User, fields: frozenset[str]
+) -> Optional[Callable[[], None]]:
+    """Invalidates the user's mailing lists after relevant changes."""
+
+    if fields.isdisjoint(RELEVANT_FIELDS):
+        return None
+
+    return partial(invalidate_member, user)
+
+
+@on_commissions_change
+def invalidate_commissions(_: int, commissions: frozenset[Commission]) -> None:
+    """Invalidates the mailing lists targeting the changed commissions."""
+
+    get_mailing_lists().invalidate(
+        lambda targets, _: not targets.commissions.isdisjoint(commissions)
+    )
+
+
+def get_users(*targets: Target) -> ModelSelect:
+    """Selects the users matching any of the targets."""
+
+    return User.select().where(get_condition(targets))
+
+
+def get_emails(
+    *targets: Target, stream: bool = False, chunk_size: Optional[int] = None
+) -> Iterator[str]:
+    """Yields email addresses for the given targets.
+
+    In streaming mode, the addresses are fetched in chunks
+    from a server-side cursor to keep memory usage constant.
+    """
+
+    select = User.select(User.email).where(get_condition(targets)).tuples()
+
+    if stream:
+        rows = stream_rows(select, chunk_size or get_chunk_size())
+    else:
+        rows = select
+
+    for (email,) in rows:
+        yield email
+
+
+def get_chunk_size(*, section: str = "mailinglist") -> int:
+    """Returns the configured amount of rows per fetch."""
+
+    return CONFIG.getint(section, "chunk_size", fallback=1000)
+
+
+def stream_rows(select: ModelSelect, chunk_size: int) -> Iterator[tuple[Any, ...]]:
+    """Yields the rows of the select from a server-side cursor.
+
+    The database connection must not be used for
+    other queries until the rows are exhausted.
+    """
+
+    # Server-side cursors are specific to the MySQL driver.
+    from pymysql.cursors import SSCursor
+
+    sql, params = select.sql()
+    cursor = DATABASE.connection().cursor(SSCursor)
+
+    try:
+        cursor.execute(sql, params)
+
+        while rows := cursor.fetchmany(chunk_size):
+            yield from rows
+    finally:
+        cursor.close()
+
+
+def get_condition(targets: tuple[Target, ...]) -> Expression:
+    """Returns a select expression."""
 
-    return condition
+    return Targets.from_targets(targets).condition
@@ -8,7 +8,11 @@ from cshsso.orm.functions import patch_user
 from cshsso.orm.functions import set_commissions
 from cshsso.orm.models import DATABASE
 from cshsso.orm.models import BaseModel
+from cshsso.orm.models import MailingListChange
+from cshsso.orm.models import MailingListPrune
+from cshsso.orm.models import OutboundEmail
 from cshsso.orm.models import PasswordResetToken
+from cshsso.orm.models import Revocation
 from cshsso.orm.models import Session
 from cshsso.orm.models import User
 from cshsso.orm.models import UserCommission
@@ -24,11 +28,24 @@ __all__ = [
     "patch_user",
     "set_commissions",
     "BaseModel",
+    "MailingListChange",
+    "MailingListPrune",
+    "OutboundEmail",
     "PasswordResetToken",
+    "Revocation",
     "Session",
     "User",
     "UserCommission",
 ]
 
 
-MODELS = [User, Session, UserCommission, PasswordResetToken]
+MODELS = [
+    User,
+    Session,
+    UserCommission,
+    PasswordResetToken,
+    Revocation,
+    MailingListChange,
+    MailingListPrune,
+    OutboundEmail,
+]
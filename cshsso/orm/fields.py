@@ -0,0 +1,181 @@
+"""Custom database fields."""
+
+from __future__ import annotations
+from base64 import b64decode
+from binascii import Error as Base64Error
+from functools import cache
+from hashlib import sha256
+from hmac import compare_digest, new
+from enum import Enum
+from typing import Any, Iterable, Optional
+
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHash, VerificationError, VerifyMismatchError
+from peewee import CharField, Expression, Field, FieldAccessor, Value
+from peeweeplus import Argon2Field, PasswordTooShort
+
+from cshsso.config import CONFIG
+from cshsso.hashing import get_hasher
+
+
+__all__ = [
+    "PasswordHash",
+    "PasswordField",
+    "SecretHash",
+    "SecretField",
+    "enum_value",
+    "in_enum",
+]
+
+
+ARGON2_PREFIX = "$argon2"
+HMAC_PREFIX = "hmac-sha256$"
+
+
+@cache
+def get_secret_key(*, section: str = "session") -> bytes:
+    """Returns the key for hashing machine-generated secrets.
+
+    Raises ValueError if the key is not configured as base64.
+    """
+
+    if not (value := CONFIG.get(section, "secret_key", fallback=None)):
+        raise ValueError(
+            f"No secret_key configured in section [{section}]. "
+            "Set it to a random base64 string, e.g. from: openssl rand -base64 32"
+        )
+
+    try:
+        return b64decode(value, validate=True)
+    except Base64Error:
+        raise ValueError(f"Invalid base64 in [{section}] secret_key.") from None
+
+
+class SecretHash(str):
+    """A keyed hash of a high-entropy, machine-generated secret.
+
+    Legacy Argon2 hashes are still accepted for verification.
+    """
+
+    @classmethod
+    def create(cls, secret: str) -> SecretHash:
+        """Hashes the given secret."""
+        return cls(
+            HMAC_PREFIX + new(get_secret_key(), secret.encode(), sha256).hexdigest()
+        )
+
+    @property
+    def needs_rehash(self) -> bool:
+        """Determines whether this is a legacy hash that should be replaced."""
+        return not self.startswith(HMAC_PREFIX)
+
+    def verify(self, secret: str) -> bool:
+        """Verifies the secret in constant time.
+
+        Raises VerifyMismatchError on mismatch.
+        """
+        if self.startswith(ARGON2_PREFIX):
+            try:
+                return PasswordHasher().verify(self, secret)
+            except (InvalidHash, VerificationError):
+                raise VerifyMismatchError() from None
+
+        if compare_digest(self, self.create(secret)):
+            return True
+
+        raise VerifyMismatchError()
+
+
+class SecretFieldAccessor(FieldAccessor):
+    """Hashes plain text secrets on assignment."""
+
+    def __set__(self, instance: Any, value: Optional[str]) -> None:
+        if value is not None and not isinstance(value, SecretHash):
+            value = SecretHash.create(value)
+
+        super().__set__(instance, value)
+
+
+class SecretField(CharField):
+    """Stores keyed hashes of machine-generated secrets."""
+
+    accessor_class = SecretFieldAccessor
+
+    def __init__(self, *args, max_length: int = 255, **kwargs):
+        super().__init__(*args, max_length=max_length, **kwargs)
+
+    def python_value(self, value: Optional[str]) -> Optional[SecretHash]:
+        return None if value is None else SecretHash(value)
+
+    def db_value(self, value: Optional[str]) -> Optional[str]:
+        return None if value is None else str(value)
+
+
+class PasswordHash(str):
+    """An Argon2 hash of a user's password."""
+
+    @property
+    def needs_rehash(self) -> bool:
+        """Determines whether the hash uses outdated parameters."""
+        return get_hasher().check_needs_rehash(self)
+
+    def verify(self, passwd: str) -> bool:
+        """Verifies the password.
+
+        Raises VerifyMismatchError on mismatch.
+        """
+        try:
+            return get_hasher().verify(self, passwd)
+        except (InvalidHash, VerificationError):
+            raise VerifyMismatchError() from None
+
+
+class PasswordFieldAccessor(FieldAccessor):
+    """Hashes plain text passwords on assignment."""
+
+    def __set__(self, instance: Any, value: Optional[str]) -> None:
+        if value is not None and not isinstance(value, PasswordHash):
+            value = self.field.hash(value)
+
+        super().__set__(instance, value)
+
+
+class PasswordField(Argon2Field):
+    """Stores Argon2 hashes of passwords using the configured parameters."""
+
+    accessor_class = PasswordFieldAccessor
+
+    def __init__(self, *args, min_length: int = 8, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.min_length = min_length
+
+    def validate(self, passwd: str) -> None:
+        """Raises PasswordTooShort if the password is too short."""
+        if len(passwd) < self.min_length:
+            raise PasswordTooShort(self.min_length, len(passwd))
+
+    def hash(self, passwd: str) -> PasswordHash:
+        """Validates and hashes the password."""
+        self.validate(passwd)
+        return PasswordHash(get_hasher().hash(passwd))
+
+    def python_value(self, value: Optional[str]) -> Optional[PasswordHash]:
+        return None if value is None else PasswordHash(value)
+
+    def db_value(self, value: Optional[str]) -> Optional[str]:
+        return None if value is None else str(value)
+
+
+def enum_value(field: Field, member: Enum) -> Value:
+    """Wraps the enum member as a value of the field.
+
+    Roles are tuples, which peewee would otherwise unpack into their items.
+    """
+
+    return Value(member, field.db_value, unpack=False)
+
+
+def in_enum(field: Field, members: Iterable[Enum]) -> Expression:
+    """Matches any of the enum members."""
+
+    return field << [enum_value(field, member) for member in members]
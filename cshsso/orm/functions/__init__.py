@@ -1,17 +1,23 @@
 """ORM-related functions."""
 
+from cshsso.orm.functions.batch import delete_batched
 from cshsso.orm.functions.commissions import set_commissions
+from cshsso.orm.functions.commissions import set_holders
 from cshsso.orm.functions.user import delete_user
 from cshsso.orm.functions.user import get_current_user
+from cshsso.orm.functions.user import get_session_user
 from cshsso.orm.functions.user import get_user
 from cshsso.orm.functions.user import patch_user
 from cshsso.orm.functions.user import user_to_json
 
 __all__ = [
+    "delete_batched",
     "delete_user",
     "get_current_user",
+    "get_session_user",
     "get_user",
     "patch_user",
     "set_commissions",
+    "set_holders",
     "user_to_json",
 ]
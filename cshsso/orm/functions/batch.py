@@ -0,0 +1,22 @@
+"""Batched database operations."""
+
+from peewee import Expression, Model
+
+
+__all__ = ["delete_batched"]
+
+
+def delete_batched(model: type[Model], condition: Expression, batch_size: int) -> int:
+    """Deletes matching records in bounded batches
+    and returns the amount of deleted records.
+    """
+
+    deleted = 0
+
+    while ids := [
+        record.id
+        for record in model.select(model.id).where(condition).limit(batch_size)
+    ]:
+        deleted += model.delete().where(model.id << ids).execute()
+
+    return deleted
@@ -1,23 +1,125 @@
 """Commissions-related functions."""
 
-from typing import Iterable
+from collections import defaultdict
+from typing import Iterable, Mapping, Optional
 
-from cshsso.orm.models import Commission, User, UserCommission
+from cshsso.orm.fields import in_enum
+from cshsso.orm.hooks import commissions_changed
+from cshsso.orm.models import DATABASE, Commission, User, UserCommission
+from cshsso.principal import forget_principal
+from cshsso.usercache import forget_user
 
 
-__all__ = ["set_commissions"]
+__all__ = ["set_commissions", "set_holders"]
+
+
+def apply_changes(
+    obsolete: Iterable[UserCommission], new: Mapping[Commission, int]
+) -> dict[int, set[Commission]]:
+    """Deletes the obsolete commissions and inserts the new ones in bulk.
+
+    Returns the commissions gained or lost per affected user.
+    The permissions versions and revisions of the affected users are bumped
+    and the hooks are run. Must be called within a transaction, so that
+    changes logged by the hooks are committed along with the commissions.
+    """
+
+    obsolete = list(obsolete)
+    affected = defaultdict(set)
+
+    for user_commission in obsolete:
+        affected[user_commission.occupant_id].add(user_commission.commission)
+
+    for commission, user_id in new.items():
+        affected[user_id].add(commission)
+
+    if obsolete:
+        UserCommission.delete().where(
+            UserCommission.id << {uc.id for uc in obsolete}
+        ).execute()
+
+    if new:
+        UserCommission.insert_many(
+            [
+                {UserCommission.occupant: user_id, UserCommission.commission: commission}
+                for commission, user_id in new.items()
+            ]
+        ).execute()
+
+    if affected:
+        User.update(
+            permissions_version=User.permissions_version + 1,
+            revision=User.revision + 1,
+        ).where(User.id << set(affected)).execute()
+
+    for user_id, commissions in affected.items():
+        commissions_changed(user_id, commissions)
+
+    return affected
+
+
+def invalidate(changes: Mapping[int, set[Commission]]) -> None:
+    """Invalidates cached records of the affected users."""
+
+    for user_id in changes:
+        forget_user(user_id)
+        forget_principal(user_id)
 
 
 def set_commissions(user: User, commissions: Iterable[Commission]) -> None:
-    """Sets the commissions of the user."""
+    """Sets the commissions of the user.
+
+    Commissions held by other users are taken away from them.
+    """
+
+    commissions = set(commissions)
+    condition = UserCommission.occupant == user.id
+
+    if commissions:
+        condition |= in_enum(UserCommission.commission, commissions)
+
+    with DATABASE.atomic():
+        current = list(UserCommission.select().where(condition).for_update())
+        obsolete = [
+            uc
+            for uc in current
+            if uc.occupant_id != user.id or uc.commission not in commissions
+        ]
+        held = {uc.commission for uc in current if uc not in obsolete}
+        affected = apply_changes(
+            obsolete, {commission: user.id for commission in commissions - held}
+        )
+
+    invalidate(affected)
+
+    if user.id in affected:
+        user.reload_permissions_version()
+
+
+def set_holders(holders: Mapping[Commission, Optional[int]]) -> set[int]:
+    """Sets the holders of multiple commissions at once,
+    e.g. the Chargen at the turn of the semester.
 
-    current = user.user_commissions
-    new = {c for c in commissions if c not in {c.commission for c in current}}
-    delete = {uc for uc in current if uc.commission not in commissions}
+    A holder of None vacates the commission.
+    Returns the IDs of the affected users.
+    """
 
-    for user_commission in delete:
-        user_commission.delete_instance()
+    with DATABASE.atomic():
+        current = list(
+            UserCommission.select()
+            .where(in_enum(UserCommission.commission, holders))
+            .for_update()
+        )
+        obsolete = [uc for uc in current if uc.occupant_id != holders[uc.commission]]
+        held = {uc.commission for uc in current if uc not in obsolete}
+        affected = apply_changes(
+            obsolete,
+            {
+                commission: user_id
+                for commission, user_id in holders.items()
+                if user_id is not None and commission not in held
+            },
+        )
 
-    for commission in new:
-        user_commission = UserCommission(user=user, commission=commission)
-        user_commission.save()
+    invalidate(affected)
+    return set(affected)
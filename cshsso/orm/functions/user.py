@@ -9,78 +9,150 @@ from wsgilib import JSONMessage
 
 from cshsso.authorization import is_corps_member, is_in_inner_circle
 from cshsso.constants import USER_ID
+from cshsso.context import count_lookup
 from cshsso.exceptions import InvalidPassword
 from cshsso.functions import date_or_none
 from cshsso.orm.models import Session, User, UserCommission
+from cshsso.principal import forget_principal
 from cshsso.roles import Status
+from cshsso.serializer import get_serializer
+from cshsso.usercache import UserSnapshot, get_user_cache
 
 
-__all__ = ["get_user", "get_current_user", "user_to_json", "patch_user", "delete_user"]
+__all__ = [
+    "get_user",
+    "get_session_user",
+    "get_current_user",
+    "user_to_json",
+    "patch_user",
+    "delete_user",
+]
 
 
-def get_user(uid: int) -> User:
-    """Returns the destination user."""
+def load_snapshot(uid: int, version: int) -> UserSnapshot:
+    """Loads the user and its commissions from the database in one query."""
 
-    return (
+    user, commissions = None, []
+
+    for user in (
         User.select(User, UserCommission)
         .join(
             UserCommission,
             on=UserCommission.occupant == User.id,
             join_type=JOIN.LEFT_OUTER,
+            attr="user_commission",
         )
         .where(User.id == uid)
-        .group_by(User)
-        .get()
+    ):
+        if user.user_commission is not None:
+            commissions.append(dict(user.user_commission.__data__))
+
+    return UserSnapshot(
+        version,
+        None if user is None else dict(user.__data__),
+        tuple(commissions),
+    )
+
+
+def is_current(snapshot: UserSnapshot) -> bool:
+    """Checks whether the snapshot has the user's stored revision.
+
+    Snapshots of missing users are trusted until they expire.
+    """
+
+    if snapshot.user is None:
+        return True
+
+    return (
+        User.select(User.revision).where(User.id == snapshot.user["id"]).scalar()
+        == snapshot.user["revision"]
     )
 
 
-def get_current_user(session: Session, *, allow_other: bool = False) -> User:
-    """Returns the current user."""
+def restore_user(snapshot: UserSnapshot) -> User:
+    """Creates a fresh user object from the snapshot."""
+
+    user = User(__no_default__=True)
+    user.__data__.update(snapshot.user)
+    user.snapshot_id = (user.id, user.revision)
+    user.user_commissions = []
+
+    for data in snapshot.commissions:
+        user_commission = UserCommission(__no_default__=True)
+        user_commission.__data__.update(data)
+        user.user_commissions.append(user_commission)
+
+    return user
+
+
+def get_user(uid: int) -> User:
+    """Returns the destination user.
+
+    Cached users are only served if their revision matches the one in the
+    database, so that changes made by other processes are never missed.
+    Each call returns a separate object, which may be modified and saved,
+    since saving only writes the fields changed on the object.
+    """
+
+    count_lookup(f"user:{uid}")
+    cache = get_user_cache()
 
-    if session.user.admin or allow_other:
+    if (snapshot := cache.get(uid)) is None or not is_current(snapshot):
+        snapshot = load_snapshot(uid, cache.version(uid))
+        cache.set(uid, snapshot)
+
+    if snapshot.user is None:
+        raise User.DoesNotExist(f"No user with ID {uid}.")
+
+    return restore_user(snapshot)
+
+
+def get_session_user(session: Session) -> User:
+    """Returns the session's user.
+
+    Stateless sessions only carry the user's token claims,
+    so the full user record is loaded for them.
+    """
+
+    if not session.user_loaded:
+        return get_user(session.user.id)
+
+    return session.user
+
+
+def get_current_user(actor: User, *, allow_other: bool = False) -> User:
+    """Returns the current user.
+
+    The actor must be the session's full user record,
+    since the claims of stateless sessions may be outdated.
+    """
+
+    if actor.admin or allow_other:
         try:
             uid = int(request.cookies[USER_ID])
         except KeyError:
-            return session.user
+            return actor
 
-        return get_user(uid)
+        if uid != actor.id:
+            return get_user(uid)
 
-    return session.user
+    return actor
 
 
-def user_to_json(user: User, *, actor: User) -> dict:
+def user_to_json(
+    user: User, *, actor: User, fields: Optional[frozenset[str]] = None
+) -> dict:
     """Returns the current user as JSON."""
 
-    json = {
-        "id": user.id,
-        "email": user.email,
-        "first_name": user.first_name,
-        "last_name": user.last_name,
-        "name_number": user.name_number,
-        "status": user.status.to_json(),
-        "registered": user.registered.isoformat(),
-        "admin": user.admin,
-        "bio": user.bio,
-        "corps_list_number": user.corps_list_number,
-        "acception": user.acception.isodormat() if user.acception else None,
-        "reception": user.reception.isoformat() if user.reception else None,
-        "commissions": [c.to_json() for c in user.commissions],
-    }
-
-    if actor.admin:
-        json.update(
-            {
-                "verified": user.verified,
-                "locked": user.locked,
-                "failed_logins": user.failed_logins,
-            }
-        )
-
-    return json
+    return get_serializer(actor.admin, fields)(user)
 
 
 def patch_user_admin(user: User, json: dict) -> None:
-    """Patches a user from an admin context."""
+    """Patches a user from an admin context.
+
+    The caller must bump the user's permissions version after saving
+    and revoke the user's tokens if the status, admin flag or lock changed.
+    """
 
     with suppress(KeyError):
         user.email = json["email"]
@@ -156,9 +228,11 @@ def delete_user(user: User, *, actor: User, passwd: Optional[str] = None) -> boo
     """Deletes the user."""
 
     if actor.admin and actor != user:
+        forget_principal(user)
         return user.delete_instance()
 
     if passwd is not None and user.login(passwd):
+        forget_principal(user)
         return user.delete_instance()
 
     raise InvalidPassword()
@@ -0,0 +1,72 @@
+"""Hooks run on changes of users and their commissions."""
+
+from typing import Any, Callable, Iterable, Optional
+
+from cshsso.roles import Commission
+
+
+__all__ = [
+    "on_user_change",
+    "on_commissions_change",
+    "prepare_user_change",
+    "commissions_changed",
+]
+
+
+FollowUp = Callable[[], None]
+UserHook = Callable[[Any, frozenset[str]], Optional[FollowUp]]
+CommissionsHook = Callable[[int, frozenset[Commission]], None]
+USER_HOOKS: list[UserHook] = []
+COMMISSIONS_HOOKS: list[CommissionsHook] = []
+
+
+def on_user_change(hook: UserHook) -> UserHook:
+    """Registers a hook called with a user about to be saved
+    or deleted and the names of the changed fields.
+
+    The hook may return a follow-up, which is called once the change is done,
+    but before the transaction containing the change is committed.
+    """
+
+    USER_HOOKS.append(hook)
+    return hook
+
+
+def on_commissions_change(hook: CommissionsHook) -> CommissionsHook:
+    """Registers a hook called with a user's ID and
+    the commissions the user gained or lost.
+
+    The hook is called within the transaction containing the change.
+    """
+
+    COMMISSIONS_HOOKS.append(hook)
+    return hook
+
+
+def prepare_user_change(user: Any, fields: Iterable[str]) -> FollowUp:
+    """Runs the hooks for a user about to be changed.
+
+    Returns a function running the hooks' follow-ups.
+    """
+
+    fields = frozenset(fields)
+    follow_ups = [
+        follow_up
+        for hook in USER_HOOKS
+        if (follow_up := hook(user, fields)) is not None
+    ]
+
+    def follow_up() -> None:
+        for function in follow_ups:
+            function()
+
+    return follow_up
+
+
+def commissions_changed(user_id: int, commissions: Iterable[Commission]) -> None:
+    """Runs the hooks for changed commissions of a user."""
+
+    commissions = frozenset(commissions)
+
+    for hook in COMMISSIONS_HOOKS:
+        hook(user_id, commissions)
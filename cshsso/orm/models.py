@@ -1,21 +1,27 @@
 """Object-relational mappings."""
 
 from __future__ import annotations
+from collections import defaultdict
 from datetime import datetime, timedelta
+from functools import cached_property
 from uuid import uuid4
 
 from argon2.exceptions import VerifyMismatchError
+from emaillib import EMail
 from peewee import AutoField
+from peewee import BigIntegerField
 from peewee import BooleanField
+from peewee import CharField
 from peewee import DateField
 from peewee import DateTimeField
+from peewee import Field
 from peewee import ForeignKeyField
 from peewee import IntegerField
 from peewee import Model
 from peewee import ModelSelect
+from peewee import TextField
 from peewee import UUIDField
 
-from peeweeplus import Argon2Field
 from peeweeplus import EMailField
 from peeweeplus import EnumField
 from peeweeplus import HTMLTextField
@@ -25,8 +31,14 @@ from peeweeplus import UserNameField
 from cshsso.config import CONFIG
 from cshsso.constants import PW_RESET_TOKEN_VALIDITY
 from cshsso.constants import SESSION_VALIDITY
+from cshsso.orm.fields import PasswordField
+from cshsso.orm.fields import SecretField
+from cshsso.orm.fields import enum_value
+from cshsso.orm.hooks import commissions_changed, prepare_user_change
 from cshsso.roles import Status, Commission
 from cshsso.roman import roman
+from cshsso.rules import STATUS_BITS, commission_mask
+from cshsso.usercache import forget_user
 
 
 __all__ = [
@@ -36,6 +48,11 @@ __all__ = [
     "Session",
     "UserCommission",
     "PasswordResetToken",
+    "Revocation",
+    "MailingListChange",
+    "MailingListPrune",
+    "OutboundEmail",
+    "bump_revisions",
 ]
 
 
@@ -53,9 +70,20 @@ class BaseModel(Model):
 class User(BaseModel):
     """A user account."""
 
+    class Meta:
+        indexes = (
+            (("corps_list_number", "id"), False),
+            (("status", "corps_list_number", "id"), False),
+        )
+        # Cached users may be outdated, so only write what was changed.
+        only_save_dirty = True
+
+    # ID and revision of the stored state of users loaded unmodified.
+    snapshot_id = None
+
     id = AutoField()
     email = EMailField(unique=True)
-    passwd = Argon2Field()
+    passwd = PasswordField()
     first_name = UserNameField()
     last_name = UserNameField()
     registered = DateTimeField(default=datetime.now)
@@ -63,6 +91,9 @@ class User(BaseModel):
     locked = BooleanField(default=False)
     failed_logins = IntegerField(default=0)
     admin = BooleanField(default=False)
+    permissions_version = IntegerField(default=0)
+    # Incremented on every change of the user or its commissions.
+    revision = IntegerField(default=0)
     bio = HTMLTextField(null=True)
     # Corps-related information
     status = EnumField(Status, use_name=True)
@@ -88,6 +119,16 @@ class User(BaseModel):
         """Return the user's commissions."""
         return {uc.commission for uc in self.user_commissions}
 
+    @cached_property
+    def commission_mask(self) -> int:
+        """Return the bitmask of the user's commissions."""
+        return commission_mask(self.commissions)
+
+    @property
+    def roles(self) -> int:
+        """Return the bitmask of the user's status and commissions."""
+        return STATUS_BITS[self.status] | self.commission_mask
+
     @property
     def numbered_last_name(self) -> str:
         """Return the numbered last name, if applicable, else the last name."""
@@ -96,36 +137,135 @@ class User(BaseModel):
 
         return f"{self.last_name} {roman(self.name_number)}"
 
+    def save(self, *args, **kwargs) -> int:
+        """Save the user and invalidate its cached record.
+
+        The hooks' follow-ups run in the same transaction.
+        """
+        changed = self.is_dirty()
+
+        try:
+            with DATABASE.atomic():
+                follow_up = prepare_user_change(self, self._dirty)
+                result = super().save(*args, **kwargs)
+
+                if changed:
+                    self.bump_revision()
+
+                follow_up()
+        finally:
+            self.snapshot_id = None
+            forget_user(self.id)
+
+        return result
+
+    def delete_instance(self, *args, **kwargs) -> int:
+        """Delete the user and invalidate its cached record.
+
+        The hooks' follow-ups run in the same transaction.
+        """
+        try:
+            with DATABASE.atomic():
+                follow_up = prepare_user_change(self, self._meta.fields)
+                result = super().delete_instance(*args, **kwargs)
+                follow_up()
+        finally:
+            self.snapshot_id = None
+            forget_user(self.id)
+
+        return result
+
+    def bump_permissions_version(self) -> None:
+        """Invalidate cached snapshots of the user's permissions.
+
+        The version is incremented in the database, since this object
+        may be outdated. Call this after saving the changed permissions.
+        """
+        User.update(
+            permissions_version=User.permissions_version + 1,
+            revision=User.revision + 1,
+        ).where(User.id == self.id).execute()
+        forget_user(self.id)
+        self.reload_permissions_version()
+
+    def reload_permissions_version(self) -> None:
+        """Read the current permissions version from the database."""
+        self.reload_fields(User.permissions_version, User.revision)
+        self.__dict__.pop("commission_mask", None)
+
+    def bump_revision(self) -> None:
+        """Increment the revision in the database, so that
+        cached snapshots of the user are discarded by all processes.
+        """
+        User.update(revision=User.revision + 1).where(User.id == self.id).execute()
+        self.reload_fields(User.revision)
+
+    def reload_fields(self, *fields: Field) -> None:
+        """Read the given fields from the database.
+
+        Use this after the fields have been updated in the database.
+        """
+        stored = User.select(*fields).where(User.id == self.id).get()
+
+        for field in fields:
+            setattr(self, field.name, getattr(stored, field.name))
+            self._dirty.discard(field.name)
+
+        self.snapshot_id = None
+
     def login(self, passwd: str) -> bool:
-        """Attempt a login."""
+        """Attempt a login.
+
+        Outdated hashes are not replaced here, but by cshsso.passwords.login().
+        """
         try:
             self.passwd.verify(passwd)
         except VerifyMismatchError:
-            self.failed_logins += 1
-            self.save()
-            return False
+            return self.record_login(False)
 
-        if self.passwd.needs_rehash:
-            self.passwd = passwd
+        return self.record_login(True)
 
-        self.failed_logins = 0
-        self.save()
-        return True
+    def record_login(self, success: bool) -> bool:
+        """Record the result of a login attempt.
+
+        The counter is updated in the database, since
+        concurrent logins may have changed it meanwhile.
+        """
+        User.update(
+            failed_logins=0 if success else User.failed_logins + 1,
+            revision=User.revision + 1,
+        ).where(User.id == self.id).execute()
+        self.reload_fields(User.failed_logins, User.revision)
+        forget_user(self.id)
+        return success
 
     def has_commission(self, commission: Commission) -> ModelSelect:
         """Select user commissions of the given type of this user."""
-        return self.user_commissions.where(UserCommission.commission == commission)
+        return UserCommission.select().where(
+            (UserCommission.occupant == self.id)
+            & (
+                UserCommission.commission
+                == enum_value(UserCommission.commission, commission)
+            )
+        )
 
 
 class Session(BaseModel):
     """A user session."""
 
+    # Set on sessions restored from signed tokens, which are not stored.
+    stateless = False
+    # Unset if the user only carries the token claims.
+    user_loaded = True
+
     id = AutoField()
     user = ForeignKeyField(
         User, column_name="user", on_delete="CASCADE", lazy_load=False
     )
-    secret = Argon2Field()
-    valid_until = DateTimeField(default=lambda: datetime.now() + SESSION_VALIDITY)
+    secret = SecretField()
+    valid_until = DateTimeField(
+        default=lambda: datetime.now() + SESSION_VALIDITY, index=True
+    )
 
     def is_valid(self) -> bool:
         """Return True if the session is valid, else False."""
@@ -154,6 +294,60 @@ class UserCommission(BaseModel):
     )
     commission = EnumField(Commission, use_name=True, unique=True)
 
+    def save(self, *args, **kwargs) -> int:
+        """Save the commission and invalidate the cached records
+        of its previous and current occupant.
+
+        The hooks run in the same transaction.
+        """
+        changes = defaultdict(set)
+
+        try:
+            with DATABASE.atomic():
+                if self._pk is not None and not kwargs.get("force_insert"):
+                    stored = (
+                        UserCommission.select(
+                            UserCommission.occupant, UserCommission.commission
+                        )
+                        .where(UserCommission.id == self._pk)
+                        .get()
+                    )
+                    changes[stored.occupant_id] ^= {stored.commission}
+
+                changes[self.occupant_id] ^= {self.commission}
+                result = super().save(*args, **kwargs)
+                bump_revisions(*changes)
+
+                for user_id, commissions in changes.items():
+                    if commissions:
+                        commissions_changed(user_id, commissions)
+        finally:
+            for user_id in changes:
+                forget_user(user_id)
+
+        return result
+
+    def delete_instance(self, *args, **kwargs) -> int:
+        """Delete the commission and invalidate its occupant's cached record.
+
+        The hooks run in the same transaction.
+        """
+        try:
+            with DATABASE.atomic():
+                result = super().delete_instance(*args, **kwargs)
+                bump_revisions(self.occupant_id)
+                commissions_changed(self.occupant_id, {self.commission})
+        finally:
+            forget_user(self.occupant_id)
+
+        return result
+
+
+def bump_revisions(*user_ids: int) -> None:
+    """Increments the revisions of the given users in the database."""
+
+    User.update(revision=User.revision + 1).where(User.id << set(user_ids)).execute()
+
 
 class PasswordResetToken(BaseModel):
     """A per-user password reset token."""
@@ -166,10 +360,82 @@ class PasswordResetToken(BaseModel):
         User, column_name="user", on_delete="CASCADE", lazy_load=False
     )
     token = UUIDField(default=uuid4)
-    issued = DateTimeField(default=datetime.now)
+    issued = DateTimeField(default=datetime.now, index=True)
 
     def is_valid(self) -> bool:
         """Return True if the password reset
         token is currently valid, else False.
         """
         return self.issued + PW_RESET_TOKEN_VALIDITY > datetime.now()
+
+
+class Revocation(BaseModel):
+    """A revoked session token or all tokens of a user issued until revocation."""
+
+    id = AutoField()
+    token = BigIntegerField(null=True)
+    user = ForeignKeyField(
+        User, column_name="user", null=True, on_delete="CASCADE", lazy_load=False
+    )
+    revoked = DateTimeField(default=datetime.now)
+    expires = DateTimeField(index=True)
+
+
+class MailingListChange(BaseModel):
+    """A change of a user's properties relevant to mailing lists.
+
+    Old values of None denote a newly created user
+    and new values of None denote a deleted user.
+    """
+
+    class Meta:
+        table_name = "mailing_list_change"
+
+    id = AutoField()
+    # No foreign key, since changes outlive deleted users.
+    user = IntegerField(column_name="user", index=True)
+    logged = DateTimeField(default=datetime.now, index=True)
+    old_email = EMailField(null=True)
+    old_status = EnumField(Status, use_name=True, null=True)
+    old_commissions = BigIntegerField(null=True)
+    new_email = EMailField(null=True)
+    new_status = EnumField(Status, use_name=True, null=True)
+    new_commissions = BigIntegerField(null=True)
+
+
+class MailingListPrune(BaseModel):
+    """Watermark of deleted mailing list changes."""
+
+    class Meta:
+        table_name = "mailing_list_prune"
+
+    id = AutoField()
+    # Changes with IDs up to and including this one have been deleted.
+    until = IntegerField()
+    pruned = DateTimeField(default=datetime.now)
+
+
+class OutboundEmail(BaseModel):
+    """An email queued for sending."""
+
+    class Meta:
+        table_name = "outbound_email"
+        indexes = ((("sent", "due"), False),)
+
+    id = AutoField()
+    subject = CharField(255)
+    sender = CharField(255)
+    recipient = CharField(255)
+    plain = TextField(null=True)
+    html = TextField(null=True)
+    queued = DateTimeField(default=datetime.now)
+    due = DateTimeField(default=datetime.now)
+    attempts = IntegerField(default=0)
+    sent = DateTimeField(null=True)
+    error = TextField(null=True)
+
+    def to_email(self) -> EMail:
+        """Return the email to send."""
+        return EMail(
+            self.subject, self.sender, self.recipient, plain=self.plain, html=self.html
+        )
@@ -0,0 +1,276 @@
+"""Durable outbox of emails sent by a background worker."""
+
+from __future__ import annotations
+from argparse import ArgumentParser
+from datetime import datetime, timedelta
+from logging import DEBUG, INFO, basicConfig, getLogger
+from smtplib import SMTP, SMTPException
+from time import sleep
+from typing import Iterable, NamedTuple, Optional
+
+from peewee import InterfaceError, OperationalError
+
+from cshsso.config import CONFIG, CONFIG_FILE
+from cshsso.email import CONNECTION_ERRORS, get_smtp_pool
+from cshsso.orm.models import DATABASE, OutboundEmail
+
+
+__all__ = [
+    "OutboxSettings",
+    "queue",
+    "claim",
+    "deliver",
+    "process",
+    "dead_letters",
+    "work",
+    "run",
+]
+
+
+LOGGER = getLogger("cshsso-mail-worker")
+WORKER_PARSER = ArgumentParser(description="Send queued CSHSSO emails.")
+WORKER_PARSER.add_argument(
+    "-1", "--once", action="store_true", help="exit when the outbox is empty"
+)
+WORKER_PARSER.add_argument(
+    "-d",
+    "--dead-letters",
+    action="store_true",
+    help="list emails that exceeded the maximum attempts and exit",
+)
+WORKER_PARSER.add_argument("-v", "--verbose", action="store_true", help="be gassy")
+
+
+class OutboxSettings(NamedTuple):
+    """Settings of the outbox worker."""
+
+    batch_size: int
+    interval: float
+    max_attempts: int
+    backoff: float
+    max_backoff: float
+
+    @classmethod
+    def from_config(cls, section: str = "outbox") -> OutboxSettings:
+        """Reads the settings from the configuration."""
+        return cls(
+            CONFIG.getint(section, "batch_size", fallback=50),
+            CONFIG.getfloat(section, "interval", fallback=5),
+            CONFIG.getint(section, "max_attempts", fallback=8),
+            CONFIG.getfloat(section, "backoff", fallback=30),
+            CONFIG.getfloat(section, "max_backoff", fallback=3600),
+        )
+
+    def retry_delay(self, attempts: int) -> timedelta:
+        """Returns the delay before the next attempt."""
+        return timedelta(
+            seconds=min(self.backoff * 2 ** (attempts - 1), self.max_backoff)
+        )
+
+
+def queue(
+    subject: str,
+    sender: str,
+    recipient: str,
+    *,
+    plain: Optional[str] = None,
+    html: Optional[str] = None,
+) -> OutboundEmail:
+    """Queues an email for sending.
+
+    Call this within the transaction that creates the
+    record the email refers to, so that both are committed
+    together or not at all.
+    """
+
+    return OutboundEmail.create(
+        subject=subject, sender=sender, recipient=recipient, plain=plain, html=html
+    )
+
+
+def claim(settings: OutboxSettings) -> list[OutboundEmail]:
+    """Selects due emails and locks them against other workers.
+
+    Must be called within a transaction.
+    """
+
+    return list(
+        OutboundEmail.select()
+        .where(
+            OutboundEmail.sent.is_null()
+            & (OutboundEmail.due <= datetime.now())
+            & (OutboundEmail.attempts < settings.max_attempts)
+        )
+        .order_by(OutboundEmail.due)
+        .limit(settings.batch_size)
+        .for_update("FOR UPDATE SKIP LOCKED")
+    )
+
+
+def deliver(
+    smtp: SMTP, outbound_email: OutboundEmail, settings: OutboxSettings
+) -> bool:
+    """Sends the email over the connection and records the outcome.
+
+    A lost connection is not counted as an attempt and is re-raised.
+    """
+
+    try:
+        smtp.send_message(outbound_email.to_email())
+    except CONNECTION_ERRORS:
+        raise
+    except (SMTPException, OSError) as error:
+        outbound_email.attempts += 1
+        outbound_email.error = str(error)
+        outbound_email.due = datetime.now() + settings.retry_delay(
+            outbound_email.attempts
+        )
+        outbound_email.save()
+
+        if outbound_email.attempts < settings.max_attempts:
+            LOGGER.warning("Could not send email %i: %s", outbound_email.id, error)
+        else:
+            LOGGER.error(
+                "Giving up on email %i to %s after %i attempts: %s",
+                outbound_email.id,
+                outbound_email.recipient,
+                outbound_email.attempts,
+                error,
+            )
+
+        return False
+
+    outbound_email.attempts += 1
+    outbound_email.sent = datetime.now()
+    outbound_email.error = None
+    outbound_email.save()
+    return True
+
+
+def postpone(emails: Iterable[OutboundEmail], settings: OutboxSettings) -> None:
+    """Delays the emails without counting an attempt."""
+
+    for outbound_email in emails:
+        outbound_email.due = datetime.now() + settings.retry_delay(
+            outbound_email.attempts + 1
+        )
+        outbound_email.save()
+
+
+def process(settings: OutboxSettings) -> int:
+    """Sends one batch of due emails over a pooled connection.
+
+    A dropped connection is replaced, unless the replacement
+    drops before sending anything either. Emails that could
+    not be sent due to connection errors are postponed.
+    Returns the amount of processed emails.
+    """
+
+    sent = index = 0
+    retried = False
+
+    with DATABASE.atomic():
+        if not (batch := claim(settings)):
+            return 0
+
+        while True:
+            start = index
+
+            try:
+                with get_smtp_pool().connection() as smtp:
+                    while index < len(batch):
+                        sent += deliver(smtp, batch[index], settings)
+                        index += 1
+
+                break
+            except CONNECTION_ERRORS as error:
+                LOGGER.warning("SMTP connection lost: %s", error)
+            except (SMTPException, OSError) as error:
+                LOGGER.error("Could not connect to mail server: %s", error)
+                postpone(batch[index:], settings)
+                break
+
+            if retried and index == start:
+                postpone(batch[index:], settings)
+                break
+
+            retried = True
+
+    LOGGER.debug("Sent %i of %i emails.", sent, len(batch))
+    return index
+
+
+def dead_letters(settings: OutboxSettings) -> list[OutboundEmail]:
+    """Returns unsent emails that exceeded the maximum attempts."""
+
+    return list(
+        OutboundEmail.select()
+        .where(
+            OutboundEmail.sent.is_null()
+            & (OutboundEmail.attempts >= settings.max_attempts)
+        )
+        .order_by(OutboundEmail.queued)
+    )
+
+
+def close_connection() -> None:
+    """Closes the database connection, so that the next query reconnects."""
+
+    try:
+        DATABASE.close()
+    except (InterfaceError, OperationalError) as error:
+        LOGGER.debug("Could not close database connection: %s", error)
+
+
+def work(settings: OutboxSettings, *, once: bool = False) -> None:
+    """Processes the outbox until interrupted.
+
+    Database errors, e.g. on restarts of the database server,
+    are logged and retried after the interval.
+    If once is set, returns when the outbox is empty.
+    """
+
+    while True:
+        try:
+            if process(settings) == settings.batch_size:
+                continue
+        except OperationalError as error:
+            LOGGER.error("Database error: %s", error)
+            close_connection()
+        else:
+            if once:
+                return
+
+        sleep(settings.interval)
+
+
+def run() -> int:
+    """Sends queued emails."""
+
+    args = WORKER_PARSER.parse_args()
+    basicConfig(level=DEBUG if args.verbose else INFO)
+    CONFIG.read(CONFIG_FILE)
+    settings = OutboxSettings.from_config()
+
+    if args.dead_letters:
+        for outbound_email in dead_letters(settings):
+            print(
+                outbound_email.id,
+                outbound_email.queued.isoformat(),
+                outbound_email.recipient,
+                outbound_email.subject,
+                outbound_email.error,
+                sep="\t",
+            )
+
+        return 0
+
+    if undeliverable := len(dead_letters(settings)):
+        LOGGER.warning("%i emails exceeded the maximum attempts.", undeliverable)
+
+    try:
+        work(settings, once=args.once)
+    except KeyboardInterrupt:
+        pass
+
+    return 0
@@ -0,0 +1,93 @@
+"""Password hashing on worker pools."""
+
+from __future__ import annotations
+from logging import getLogger
+
+from argon2.exceptions import InvalidHash, VerificationError
+
+from cshsso.exceptions import Overloaded
+from cshsso.hashing import HashParameters, get_hasher
+from cshsso.orm.models import User
+from cshsso.pool import get_pool
+from cshsso.usercache import forget_user
+
+
+__all__ = [
+    "HashParameters",
+    "get_hasher",
+    "hash_password",
+    "verify_password",
+    "rehash_password",
+    "login",
+]
+
+
+LOGGER = getLogger("cshsso")
+
+
+def hash_password(passwd: str) -> str:
+    """Hashes the password."""
+
+    return get_hasher().hash(passwd)
+
+
+def verify_password(hash: str, passwd: str) -> tuple[bool, bool]:
+    """Verifies the password against the hash.
+
+    Returns whether the password matches and
+    whether the hash needs to be recalculated.
+    """
+
+    hasher = get_hasher()
+
+    try:
+        hasher.verify(hash, passwd)
+    except (InvalidHash, VerificationError):
+        return False, False
+
+    return True, hasher.check_needs_rehash(hash)
+
+
+def rehash_password(user_id: int, hash: str, passwd: str) -> bool:
+    """Replaces the user's password hash with one using the current parameters.
+
+    The hash is only replaced if it did not change meanwhile.
+    """
+
+    if not User.update(
+        passwd=User.passwd.python_value(hash_password(passwd)),
+        revision=User.revision + 1,
+    ).where((User.id == user_id) & (User.passwd == hash)).execute():
+        return False
+
+    forget_user(user_id)
+    return True
+
+
+def schedule_rehash(user: User, passwd: str, *, section: str = "rehash") -> None:
+    """Schedules a rehash of the user's password in the background.
+
+    The rehash is skipped if the queue is full, since the next login retries it.
+    """
+
+    try:
+        get_pool(section).submit(rehash_password, user.id, str(user.passwd), passwd)
+    except Overloaded:
+        LOGGER.warning("Rehash queue full. Skipping rehash of user %i.", user.id)
+
+
+def login(user: User, passwd: str, *, section: str = "login") -> bool:
+    """Attempts a login of the user, hashing on the login worker pool.
+
+    Raises Overloaded if the pool is at capacity.
+    """
+
+    success, needs_rehash = get_pool(section).run(
+        verify_password, str(user.passwd), passwd
+    )
+    user.record_login(success)
+
+    if success and needs_rehash:
+        schedule_rehash(user, passwd)
+
+    return success
@@ -0,0 +1,66 @@
+"""Bounded worker pools for CPU-bound work."""
+
+from concurrent.futures import Executor, Future
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import cache
+from threading import BoundedSemaphore
+from typing import Any
+
+from cshsso.config import CONFIG
+from cshsso.exceptions import Overloaded
+from cshsso.typing import AnyCallable
+
+
+__all__ = ["BoundedPool", "get_pool"]
+
+
+class BoundedPool:
+    """Worker pool with a limited amount of pending tasks.
+
+    Submitting more tasks than the pool can hold fails
+    immediately instead of queuing them indefinitely.
+    """
+
+    def __init__(self, executor: Executor, capacity: int, retry_after: int = 1):
+        self.executor = executor
+        self.retry_after = retry_after
+        self._slots = BoundedSemaphore(capacity)
+
+    def submit(self, function: AnyCallable, *args, **kwargs) -> Future:
+        """Submits a task to the pool.
+
+        Raises Overloaded if the pool is at capacity.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise Overloaded(self.retry_after)
+
+        try:
+            future = self.executor.submit(function, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, function: AnyCallable, *args, **kwargs) -> Any:
+        """Runs a task on the pool and waits for its result."""
+        return self.submit(function, *args, **kwargs).result()
+
+
+@cache
+def get_pool(section: str) -> BoundedPool:
+    """Returns the worker pool configured in the given section."""
+
+    workers = CONFIG.getint(section, "workers", fallback=2)
+
+    if CONFIG.get(section, "executor", fallback="thread") == "process":
+        executor = ProcessPoolExecutor(workers)
+    else:
+        executor = ThreadPoolExecutor(workers, thread_name_prefix=section)
+
+    return BoundedPool(
+        executor,
+        workers + CONFIG.getint(section, "queue_size", fallback=8),
+        CONFIG.getint(section, "retry_after", fallback=1),
+    )
@@ -0,0 +1,89 @@
+"""Cached per-user permission snapshots."""
+
+from __future__ import annotations
+from functools import cache
+from typing import NamedTuple, Union
+
+from cshsso.cache import CacheInfo, LRUCache
+from cshsso.config import CONFIG
+from cshsso.convents import ConventAuth
+from cshsso.orm.models import User
+from cshsso.roles import Circle, CommissionGroup
+from cshsso.rules import circle_rule, convent_rule, group_rule
+
+
+__all__ = ["Principal", "get_principal", "forget_principal", "principal_cache_info"]
+
+
+CIRCLE_MASKS = {circle.name: circle_rule(circle).mask for circle in Circle}
+GROUP_MASKS = {group.name: group_rule(group).mask for group in CommissionGroup}
+CONVENT_MASKS = {convent.name: convent_rule(convent).mask for convent in ConventAuth}
+
+
+def matching(masks: dict[str, int], roles: int) -> frozenset[str]:
+    """Returns the names of the masks matching the given roles."""
+
+    return frozenset(name for name, mask in masks.items() if roles & mask)
+
+
+class Principal(NamedTuple):
+    """Snapshot of a user's permissions."""
+
+    user: int
+    version: int
+    admin: bool
+    roles: int
+    circles: frozenset[str]
+    groups: frozenset[str]
+    convents: frozenset[str]
+
+    @classmethod
+    def from_user(cls, user: User) -> Principal:
+        """Creates a snapshot of the user's permissions."""
+        return cls(
+            user.id,
+            user.permissions_version,
+            user.admin,
+            roles := user.roles,
+            matching(CIRCLE_MASKS, roles),
+            matching(GROUP_MASKS, roles),
+            matching(CONVENT_MASKS, roles),
+        )
+
+
+@cache
+def get_principals(*, section: str = "principals") -> LRUCache:
+    """Returns the cache of permission snapshots."""
+
+    return LRUCache(
+        CONFIG.getint(section, "cache_size", fallback=4096),
+        CONFIG.getfloat(section, "cache_ttl", fallback=300),
+    )
+
+
+def get_principal(user: User) -> Principal:
+    """Returns the permission snapshot of the given user.
+
+    Snapshots are only reused while the user's permissions version is unchanged.
+    """
+
+    principals = get_principals()
+
+    if (principal := principals.get(user.id)) is not None:
+        if principal.version == user.permissions_version:
+            return principal
+
+    principals.set(user.id, principal := Principal.from_user(user))
+    return principal
+
+
+def forget_principal(user: Union[User, int]) -> None:
+    """Removes the permission snapshot of the given user."""
+
+    get_principals().pop(user if isinstance(user, int) else user.id)
+
+
+def principal_cache_info() -> CacheInfo:
+    """Returns statistics of the permission snapshot cache."""
+
+    return get_principals().info()
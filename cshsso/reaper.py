@@ -0,0 +1,159 @@
+"""Removal of expired sessions, tokens, revocations, change logs and emails."""
+
+from argparse import ArgumentParser
+from datetime import datetime, timedelta
+from logging import DEBUG, INFO, basicConfig, getLogger
+from threading import Event, Thread
+from time import perf_counter
+from typing import Callable, Iterator, NamedTuple
+
+from peewee import fn
+
+from cshsso.config import CONFIG, CONFIG_FILE
+from cshsso.constants import PW_RESET_TOKEN_VALIDITY
+from cshsso.orm.functions import delete_batched
+from cshsso.orm.models import MailingListChange, MailingListPrune, OutboundEmail
+from cshsso.orm.models import PasswordResetToken, Revocation
+from cshsso.sessionstore import get_store
+
+
+__all__ = ["reap", "run", "start_reaper"]
+
+
+LOGGER = getLogger("cshsso-reap")
+REAP_PARSER = ArgumentParser(description="Delete expired CSHSSO records.")
+REAP_PARSER.add_argument(
+    "-b", "--batch-size", type=int, default=1000, help="records per DELETE"
+)
+REAP_PARSER.add_argument("-v", "--verbose", action="store_true", help="be gassy")
+
+
+class ReapResult(NamedTuple):
+    """Result of a reaping run."""
+
+    name: str
+    deleted: int
+    seconds: float
+
+    def __str__(self) -> str:
+        return f"Deleted {self.deleted} {self.name} in {self.seconds:.3f} seconds."
+
+
+def reap_sessions(batch_size: int) -> int:
+    """Deletes expired sessions."""
+
+    return get_store().purge(batch_size=batch_size)
+
+
+def reap_password_reset_tokens(batch_size: int) -> int:
+    """Deletes expired password reset tokens."""
+
+    return delete_batched(
+        PasswordResetToken,
+        PasswordResetToken.issued <= datetime.now() - PW_RESET_TOKEN_VALIDITY,
+        batch_size,
+    )
+
+
+def reap_revocations(batch_size: int) -> int:
+    """Deletes revocations of tokens that have expired anyway."""
+
+    return delete_batched(Revocation, Revocation.expires <= datetime.now(), batch_size)
+
+
+def reap_mailing_list_changes(batch_size: int, *, section: str = "mailinglist") -> int:
+    """Deletes mailing list changes older than the configured retention.
+
+    The watermark is recorded before deleting, so that
+    cursors pointing to deleted changes are detected.
+    """
+
+    until = (
+        MailingListChange.select(fn.MAX(MailingListChange.id))
+        .where(
+            MailingListChange.logged
+            <= datetime.now()
+            - timedelta(days=CONFIG.getint(section, "change_retention", fallback=30))
+        )
+        .scalar()
+    )
+
+    if until is None:
+        return 0
+
+    watermark = MailingListPrune.create(until=until)
+    MailingListPrune.delete().where(MailingListPrune.id < watermark.id).execute()
+    return delete_batched(MailingListChange, MailingListChange.id <= until, batch_size)
+
+
+def reap_sent_emails(batch_size: int, *, section: str = "outbox") -> int:
+    """Deletes sent emails older than the configured retention."""
+
+    return delete_batched(
+        OutboundEmail,
+        OutboundEmail.sent
+        <= datetime.now()
+        - timedelta(days=CONFIG.getint(section, "retention", fallback=7)),
+        batch_size,
+    )
+
+
+REAPERS: dict[str, Callable[[int], int]] = {
+    "sessions": reap_sessions,
+    "password reset tokens": reap_password_reset_tokens,
+    "revocations": reap_revocations,
+    "mailing list changes": reap_mailing_list_changes,
+    "sent emails": reap_sent_emails,
+}
+
+
+def reap(*, batch_size: int = 1000) -> Iterator[ReapResult]:
+    """Deletes expired records and yields the results."""
+
+    for name, reaper in REAPERS.items():
+        start = perf_counter()
+        deleted = reaper(batch_size)
+        yield ReapResult(name, deleted, perf_counter() - start)
+
+
+def run() -> int:
+    """Deletes expired records."""
+
+    args = REAP_PARSER.parse_args()
+    basicConfig(level=DEBUG if args.verbose else INFO)
+    CONFIG.read(CONFIG_FILE)
+
+    for result in reap(batch_size=args.batch_size):
+        LOGGER.info(str(result))
+
+    return 0
+
+
+class Reaper(Thread):
+    """Periodically deletes expired records in the background."""
+
+    def __init__(self, interval: float, batch_size: int):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.batch_size = batch_size
+        self.stopped = Event()
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            try:
+                for result in reap(batch_size=self.batch_size):
+                    LOGGER.debug(str(result))
+            except Exception as error:
+                LOGGER.exception(error)
+
+
+def start_reaper(*, section: str = "reaper") -> None:
+    """Starts the in-process reaper if enabled in the configuration."""
+
+    if not CONFIG.getboolean(section, "enabled", fallback=False):
+        return
+
+    Reaper(
+        CONFIG.getfloat(section, "interval", fallback=3600),
+        CONFIG.getint(section, "batch_size", fallback=1000),
+    ).start()
@@ -0,0 +1,112 @@
+"""Authorization checks for many users at once."""
+
+from functools import reduce
+from operator import or_
+from typing import Iterable, Union
+
+from peewee import JOIN, Expression, ModelSelect, Value
+
+from cshsso.convents import ConventAuth
+from cshsso.decorators import Authorization
+from cshsso.orm.fields import in_enum
+from cshsso.orm.models import User, UserCommission
+from cshsso.roles import Circle, CommissionGroup
+from cshsso.rules import COMMISSION_BITS, STATUS_BITS, Rule
+from cshsso.rules import circle_rule, convent_rule, group_rule
+
+
+__all__ = [
+    "get_rule",
+    "get_condition",
+    "get_eligible_users",
+    "get_roles",
+    "authorize_users",
+]
+
+
+Check = Union[Authorization, ConventAuth, Circle, CommissionGroup]
+
+
+def get_rule(check: Check) -> Rule:
+    """Returns the rule of the given check."""
+
+    if isinstance(check, ConventAuth):
+        return convent_rule(check)
+
+    if isinstance(check, Circle):
+        return circle_rule(check)
+
+    if isinstance(check, CommissionGroup):
+        return group_rule(check)
+
+    return check.rule
+
+
+def get_condition(check: Check) -> Expression:
+    """Translates the check into a condition on users."""
+
+    rule = get_rule(check)
+    conditions = []
+
+    if rule.status:
+        conditions.append(in_enum(User.status, set(rule.status)))
+
+    if rule.commissions:
+        conditions.append(
+            User.id
+            << UserCommission.select(UserCommission.occupant).where(
+                in_enum(UserCommission.commission, set(rule.commissions))
+            )
+        )
+
+    if not conditions:
+        return Value(False)
+
+    return reduce(or_, conditions)
+
+
+def get_eligible_users(check: Check, *fields) -> ModelSelect:
+    """Selects the users passing the given check."""
+
+    return User.select(*fields).where(get_condition(check))
+
+
+def get_roles(user_ids: Iterable[int]) -> dict[int, int]:
+    """Loads the role bitmasks of the given users in one query."""
+
+    roles = {}
+
+    for user_id, status, commission in (
+        User.select(User.id, User.status, UserCommission.commission)
+        .join(
+            UserCommission,
+            on=UserCommission.occupant == User.id,
+            join_type=JOIN.LEFT_OUTER,
+        )
+        .where(User.id << set(user_ids))
+        .tuples()
+    ):
+        mask = roles.get(user_id, 0) | STATUS_BITS[status]
+
+        if commission is not None:
+            mask |= COMMISSION_BITS[commission]
+
+        roles[user_id] = mask
+
+    return roles
+
+
+def authorize_users(
+    user_ids: Iterable[int], checks: Iterable[Check]
+) -> dict[int, dict[str, bool]]:
+    """Evaluates the given checks for the given users.
+
+    Returns the results per user ID and check name.
+    Unknown users are omitted. Admin rights are not taken into account.
+    """
+
+    masks = {check.name: get_rule(check).mask for check in checks}
+    return {
+        user_id: {name: roles & mask != 0 for name, mask in masks.items()}
+        for user_id, roles in get_roles(user_ids).items()
+    }
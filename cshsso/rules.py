@@ -0,0 +1,118 @@
+"""Authorization rules compiled to role bitmasks."""
+
+from __future__ import annotations
+from typing import Iterable, NamedTuple
+
+from cshsso.convents import Convent, ConventAuth
+from cshsso.roles import Circle, Commission, CommissionGroup, Status
+
+
+__all__ = [
+    "STATUS_BITS",
+    "COMMISSION_BITS",
+    "Rule",
+    "commission_mask",
+    "role_mask",
+    "circle_rule",
+    "group_rule",
+    "convent_rule",
+]
+
+
+STATUS_BITS = {status: 1 << index for index, status in enumerate(Status)}
+COMMISSION_BITS = {
+    commission: 1 << (len(STATUS_BITS) + index)
+    for index, commission in enumerate(Commission)
+}
+INNER_OUTER = frozenset({*Circle.INNER, *Circle.OUTER})
+INNER_OUTER_GUEST = frozenset({*INNER_OUTER, *Circle.GUESTS})
+
+
+def commission_mask(commissions: Iterable[Commission]) -> int:
+    """Returns the bitmask of the given commissions."""
+
+    mask = 0
+
+    for commission in commissions:
+        mask |= COMMISSION_BITS[commission]
+
+    return mask
+
+
+def role_mask(status: Status, commissions: Iterable[Commission]) -> int:
+    """Returns the bitmask of the given status and commissions."""
+
+    return STATUS_BITS[status] | commission_mask(commissions)
+
+
+class Rule(NamedTuple):
+    """Authorizes users having any of the given status or commissions."""
+
+    status: frozenset[Status] = frozenset()
+    commissions: frozenset[Commission] = frozenset()
+
+    def __or__(self, other: Rule) -> Rule:
+        return Rule(self.status | other.status, self.commissions | other.commissions)
+
+    @property
+    def mask(self) -> int:
+        """Returns the rule's bitmask."""
+        mask = commission_mask(self.commissions)
+
+        for status in self.status:
+            mask |= STATUS_BITS[status]
+
+        return mask
+
+
+def circle_rule(circle: Circle) -> Rule:
+    """Returns the rule for the given circle."""
+
+    if circle is Circle.INNER:
+        return Rule(frozenset(Circle.INNER))
+
+    if circle is Circle.OUTER:
+        return Rule(INNER_OUTER)
+
+    if circle is Circle.GUESTS:
+        return Rule(INNER_OUTER_GUEST)
+
+    raise NotImplementedError(f"Handling of circle {circle} not implemented.")
+
+
+def group_rule(group: CommissionGroup) -> Rule:
+    """Returns the rule for the given commission group."""
+
+    return Rule(commissions=frozenset(group))
+
+
+def convent_rule(convent: ConventAuth) -> Rule:
+    """Returns the rule for the given convent authorization."""
+
+    if convent.convent is Convent.AHC:
+        if convent.vote:
+            return Rule(frozenset({Status.AH, Status.EB}))
+
+        return Rule(
+            frozenset({Status.AH, Status.EB, Status.BBZ}),
+            frozenset({Commission.SENIOR}),
+        )
+
+    if convent.convent is Convent.FCC:
+        return Rule(frozenset(Circle.INNER))
+
+    if convent.convent is Convent.CC:
+        if convent.vote:
+            return Rule(frozenset({Status.CB, Status.EB})) | group_rule(
+                CommissionGroup.AHV
+            )
+
+        return Rule(frozenset(Circle.INNER))
+
+    if convent.convent is Convent.FC:
+        if convent.vote:
+            return Rule(frozenset({Status.F, Status.EB}), frozenset({Commission.FM}))
+
+        return Rule(INNER_OUTER)
+
+    raise NotImplementedError(f"Convent {convent.convent} is not implemented.")
@@ -0,0 +1,153 @@
+"""Compiled JSON serialization of users."""
+
+from __future__ import annotations
+from functools import cache, lru_cache
+from json import dumps as json_dumps
+from operator import attrgetter
+from typing import Any, Callable, NamedTuple, Optional
+
+from cshsso.cache import CacheInfo, LRUCache
+from cshsso.config import CONFIG
+from cshsso.exceptions import InvalidFields
+from cshsso.orm.models import User
+
+try:
+    from orjson import dumps as orjson_dumps
+except ImportError:
+    orjson_dumps = None
+
+
+__all__ = [
+    "FIELDS",
+    "ADMIN_FIELDS",
+    "Serializer",
+    "dumps",
+    "parse_fields",
+    "get_serializer",
+    "encode_user",
+    "encoding_cache_info",
+]
+
+
+Getter = Callable[[User], Any]
+
+
+def isoformat_or_none(value: Any) -> Optional[str]:
+    """Returns the ISO format of a date or None."""
+
+    return None if value is None else value.isoformat()
+
+
+FIELDS: dict[str, Getter] = {
+    "id": attrgetter("id"),
+    "email": attrgetter("email"),
+    "first_name": attrgetter("first_name"),
+    "last_name": attrgetter("last_name"),
+    "name_number": attrgetter("name_number"),
+    "status": lambda user: user.status.to_json(),
+    "registered": lambda user: user.registered.isoformat(),
+    "admin": attrgetter("admin"),
+    "bio": attrgetter("bio"),
+    "corps_list_number": attrgetter("corps_list_number"),
+    "acception": lambda user: isoformat_or_none(user.acception),
+    "reception": lambda user: isoformat_or_none(user.reception),
+    "commissions": lambda user: [c.to_json() for c in user.commissions],
+}
+ADMIN_FIELDS: dict[str, Getter] = {
+    "verified": attrgetter("verified"),
+    "locked": attrgetter("locked"),
+    "failed_logins": attrgetter("failed_logins"),
+}
+
+
+def dumps(obj: Any) -> bytes:
+    """Encodes the object as JSON using the fastest available backend."""
+
+    if orjson_dumps is not None:
+        return orjson_dumps(obj)
+
+    return json_dumps(obj, separators=(",", ":")).encode()
+
+
+def parse_fields(string: Optional[str]) -> Optional[frozenset[str]]:
+    """Parses a comma-separated list of field names."""
+
+    if not string:
+        return None
+
+    return frozenset(filter(None, map(str.strip, string.split(","))))
+
+
+class Serializer(NamedTuple):
+    """Serializes users to JSON-ish dicts using precompiled getters."""
+
+    admin: bool
+    names: tuple[str, ...]
+    getters: tuple[Getter, ...]
+
+    def __call__(self, user: User) -> dict[str, Any]:
+        return {name: getter(user) for name, getter in zip(self.names, self.getters)}
+
+    def encode(self, user: User) -> bytes:
+        """Encodes the user as JSON.
+
+        The encoding of users loaded unmodified from the database
+        is cached as well. It is keyed by the user's ID and revision,
+        which changes with every change of the user or its commissions.
+        """
+        if user.snapshot_id is None or user.is_dirty():
+            return dumps(self(user))
+
+        key = (user.snapshot_id, self.admin, self.names)
+
+        if (encoded := get_encodings().get(key)) is None:
+            get_encodings().set(key, encoded := dumps(self(user)))
+
+        return encoded
+
+
+@lru_cache(maxsize=256)
+def get_serializer(admin: bool, fields: Optional[frozenset[str]] = None) -> Serializer:
+    """Returns a serializer for the given actor role and field projection.
+
+    Raises InvalidFields on fields unknown to the role.
+    """
+
+    available = {**FIELDS, **ADMIN_FIELDS} if admin else FIELDS
+
+    if fields is None:
+        names = tuple(available)
+    elif invalid := fields - set(available):
+        raise InvalidFields(invalid)
+    else:
+        names = tuple(name for name in available if name in fields)
+
+    return Serializer(admin, names, tuple(available[name] for name in names))
+
+
+@cache
+def get_encodings(*, section: str = "serializer") -> LRUCache:
+    """Returns the cache of encoded users.
+
+    Entries are keyed by revision and thus never outdated,
+    so the TTL only limits how long idle users are kept.
+    """
+
+    return LRUCache(
+        CONFIG.getint(section, "cache_size", fallback=4096),
+        CONFIG.getfloat(section, "cache_ttl", fallback=3600),
+    )
+
+
+def encode_user(
+    user: User, *, actor: User, fields: Optional[frozenset[str]] = None
+) -> bytes:
+    """Encodes the user as JSON as seen by the actor."""
+
+    return get_serializer(actor.admin, fields).encode(user)
+
+
+def encoding_cache_info() -> CacheInfo:
+    """Returns statistics of the encoded user cache."""
+
+    return get_encodings().info()
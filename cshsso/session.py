@@ -1,26 +1,222 @@
 """Manage sessions."""
 
+from datetime import datetime
+from functools import cache
+from hashlib import blake2b
+from hmac import compare_digest
+from os import urandom
+from typing import Optional, Union
+
 from argon2.exceptions import VerifyMismatchError
 from flask import request, Response
-from peewee import JOIN
 
+from cshsso.cache import CacheInfo, LRUCache
 from cshsso.config import CONFIG
-from cshsso.constants import SESSION_ID, SESSION_SECRET
+from cshsso.context import check_resolutions, count_lookup, request_cached
+from cshsso.constants import SESSION_ID, SESSION_SECRET, SESSION_TOKEN
+from cshsso.constants import SESSION_VALIDITY
 from cshsso.exceptions import NotLoggedIn
 from cshsso.functions import genpw
-from cshsso.orm.models import User, Session, UserCommission
+from cshsso.orm.fields import get_secret_key
+from cshsso.orm.functions import get_user
+from cshsso.orm.models import User, Session
+from cshsso.sessionstore import get_store
+from cshsso.tokens import get_signing_keys
+from cshsso.tokens import issue_token, revoke_token, revoke_users, verify_token
 from cshsso.typing import SessionCredentials
+from cshsso.writebehind import ExtensionBuffer
 
 
 __all__ = [
+    "check_keys",
     "get_session",
     "for_user",
+    "forget_sessions",
+    "terminate_sessions",
+    "terminate_user_sessions",
+    "session_cache_info",
     "set_session_cookies",
     "delete_session_cookies",
     "post_process_response",
 ]
 
 
+DIGEST_KEY = urandom(32)
+
+
+def token_mode(*, section: str = "session") -> bool:
+    """Determines whether sessions are stateless signed tokens."""
+
+    return CONFIG.get(section, "mode", fallback="cookie") == "token"
+
+
+def check_keys() -> None:
+    """Loads the keys required by the session mode,
+    so that missing keys fail on startup.
+    """
+
+    get_secret_key()
+
+    if token_mode():
+        get_signing_keys()
+
+
+@cache
+def get_verified_sessions(*, section: str = "session") -> LRUCache:
+    """Returns the cache of recently verified sessions."""
+
+    return LRUCache(
+        CONFIG.getint(section, "cache_size", fallback=4096),
+        CONFIG.getfloat(section, "cache_ttl", fallback=300),
+    )
+
+
+def session_cache_info() -> CacheInfo:
+    """Returns statistics of the verified sessions cache."""
+
+    return get_verified_sessions().info()
+
+
+def forget_sessions(*session_ids: int) -> None:
+    """Removes the given sessions from the verified
+    sessions cache and discards pending extensions.
+    """
+
+    verified_sessions = get_verified_sessions()
+
+    for session_id in session_ids:
+        verified_sessions.pop(session_id)
+
+    if (extensions := get_extension_buffer()) is not None:
+        extensions.discard(*session_ids)
+
+
+@cache
+def get_extension_buffer(*, section: str = "session") -> Optional[ExtensionBuffer]:
+    """Returns the write-behind buffer for session
+    extensions if write-behind mode is enabled.
+    """
+
+    if not CONFIG.getboolean(section, "write_behind", fallback=False):
+        return None
+
+    extensions = ExtensionBuffer(
+        get_store().extend, CONFIG.getfloat(section, "flush_interval", fallback=30)
+    )
+    extensions.start()
+    return extensions
+
+
+def valid_until(session: Session) -> datetime:
+    """Returns the effective expiry date of the session."""
+
+    if (extensions := get_extension_buffer()) is None:
+        return session.valid_until
+
+    if (pending := extensions.get(session.id)) is None:
+        return session.valid_until
+
+    return max(session.valid_until, pending)
+
+
+def needs_extension(session: Session, *, section: str = "session") -> bool:
+    """Determines whether the session's remaining validity
+    has dropped below the configured refresh threshold.
+    """
+
+    return (
+        session.valid_until - datetime.now()
+        < SESSION_VALIDITY * CONFIG.getfloat(section, "refresh_threshold", fallback=1)
+    )
+
+
+def extend_session(session: Session) -> Session:
+    """Extends the session if required, either
+    immediately or via the write-behind buffer.
+    """
+
+    if not needs_extension(session):
+        return session
+
+    session.valid_until = datetime.now() + SESSION_VALIDITY
+
+    if (extensions := get_extension_buffer()) is None:
+        get_store().extend({session.id: session.valid_until})
+    else:
+        extensions.add(session.id, session.valid_until)
+
+    return session
+
+
+def terminate_sessions(*session_ids: int) -> None:
+    """Deletes the given sessions from the session store
+    or revokes the respective tokens in token mode.
+    """
+
+    if token_mode():
+        for session_id in session_ids:
+            revoke_token(session_id)
+
+        return
+
+    get_store().delete(*session_ids)
+    forget_sessions(*session_ids)
+
+
+def terminate_user_sessions(*users: Union[User, int]) -> dict[int, list[int]]:
+    """Deletes all sessions of the given users from the session store
+    and returns the IDs of the terminated sessions per user ID.
+
+    In token mode, all tokens issued to the users are revoked.
+    """
+
+    if token_mode():
+        revoke_users(*users)
+        return {}
+
+    terminated = get_store().delete_for_users(*users)
+
+    for sessions in terminated.values():
+        forget_sessions(*sessions)
+
+    return terminated
+
+
+def digest(secret: str) -> bytes:
+    """Returns a fast, process-local digest of the session secret."""
+
+    return blake2b(secret.encode(), key=DIGEST_KEY, digest_size=16).digest()
+
+
+def verify_secret(session: Session, secret: str) -> None:
+    """Verifies the session secret, skipping the
+    verification if it has been verified recently.
+
+    Legacy Argon2 hashes are replaced by keyed hashes on success.
+    """
+
+    verified_sessions = get_verified_sessions()
+
+    if (cached := verified_sessions.get(session.id)) is not None:
+        if compare_digest(cached, digest(secret)):
+            return
+
+    session.secret.verify(secret)
+
+    if session.secret.needs_rehash:
+        session.secret = secret
+        get_store().save_secret(session)
+
+    verified_sessions.set(
+        session.id,
+        digest(secret),
+        ttl=min(
+            verified_sessions.ttl,
+            (session.valid_until - datetime.now()).total_seconds(),
+        ),
+    )
+
+
 def get_session_credentials() -> SessionCredentials:
     """Returns the session credentials from the request."""
 
@@ -34,46 +230,86 @@ def get_session_credentials() -> SessionCredentials:
 
 
 def get_session_record(session_id: int) -> Session:
-    """Returns the session database record."""
+    """Returns the session record from the session store."""
+
+    count_lookup(f"session:{session_id}")
+    return get_store().get(session_id)
+
+
+def issue_session(user: User, token_id: Optional[int] = None) -> Session:
+    """Issues a stateless session for the given user,
+    optionally replacing the session with the given token ID.
+    """
+
+    claims, token = issue_token(user, token_id)
+    session = claims.to_session()
+    session.token = token
+    return session
+
+
+def get_token_session() -> Session:
+    """Returns a stateless session from the signed token.
+
+    Tokens whose claims are older than the refresh interval
+    are re-issued with the current data of the user.
+    """
 
     try:
-        return (
-            Session.select(Session, User, UserCommission)
-            .join(User)
-            .join(
-                UserCommission,
-                on=UserCommission.occupant == User.id,
-                join_type=JOIN.LEFT_OUTER,
-            )
-            .group_by(Session)
-            .where(Session.id == session_id)
-            .get()
-        )
-    except Session.DoesNotExist:
+        token = request.cookies[SESSION_TOKEN]
+    except KeyError:
         raise NotLoggedIn() from None
 
+    if not (claims := verify_token(token)).needs_refresh():
+        return claims.to_session()
 
+    try:
+        user = get_user(claims.user)
+    except User.DoesNotExist:
+        raise NotLoggedIn() from None
+
+    if user.disabled:
+        raise NotLoggedIn()
+
+    session = issue_session(user, claims.id)
+    # Spare loading the user again for the rest of the request.
+    session.user, session.user_loaded = user, True
+    return session
+
+
+@request_cached("session")
 def get_session() -> Session:
-    """Returns the current session object."""
+    """Returns the current session object.
+
+    The session is resolved at most once per request.
+    """
+
+    if token_mode():
+        return get_token_session()
 
     session_id, secret = get_session_credentials()
+    session = get_session_record(session_id)
+    session.valid_until = valid_until(session)
 
-    if not (session := get_session_record(session_id)).is_valid():
-        session.delete_instance()
+    if not session.is_valid():
+        terminate_sessions(session.id)
         raise NotLoggedIn() from None
 
     try:
-        session.secret.verify(secret)
+        verify_secret(session, secret)
     except VerifyMismatchError:
         raise NotLoggedIn() from None
 
-    return session.extend()
+    return extend_session(session)
 
 
-def for_user(user: User) -> tuple[Session, str]:
+def for_user(user: User) -> tuple[Session, Optional[str]]:
     """Opens a new session for the given user."""
 
-    session = Session(user=user, secret=(secret := genpw()))
+    if token_mode():
+        return issue_session(user), None
+
+    secret = genpw(length=CONFIG.getint("session", "secret_length", fallback=32))
+    session = get_store().add(Session(user=user, secret=secret))
     return session, secret
 
 
@@ -82,11 +318,14 @@ def set_session_cookies(
 ) -> Response:
     """Sets the session cookie."""
 
+    if session.stateless:
+        return set_token_cookie(response, session)
+
     for domain in CONFIG.get("auth", "domains").split():
         response.set_cookie(
             SESSION_ID,
             str(session.id),
-            expires=session.end,
+            expires=session.valid_until,
             domain=domain,
             secure=True,
             samesite=None,
@@ -96,7 +335,7 @@ def set_session_cookies(
             response.set_cookie(
                 SESSION_SECRET,
                 secret,
-                expires=session.end,
+                expires=session.valid_until,
                 domain=domain,
                 secure=True,
                 samesite=None,
@@ -105,12 +344,32 @@ def set_session_cookies(
     return response
 
 
+def set_token_cookie(response: Response, session: Session) -> Response:
+    """Sets the session token cookie, if a token has been issued."""
+
+    if (token := getattr(session, "token", None)) is None:
+        return response
+
+    for domain in CONFIG.get("auth", "domains").split():
+        response.set_cookie(
+            SESSION_TOKEN,
+            token,
+            expires=session.valid_until,
+            domain=domain,
+            secure=True,
+            samesite=None,
+        )
+
+    return response
+
+
 def delete_session_cookies(response: Response) -> Response:
     """Deletes the session cookie."""
 
     for domain in CONFIG.get("auth", "domains").split():
         response.delete_cookie(SESSION_ID, domain=domain)
         response.delete_cookie(SESSION_SECRET, domain=domain)
+        response.delete_cookie(SESSION_TOKEN, domain=domain)
 
     return response
 
@@ -118,6 +377,8 @@ def delete_session_cookies(response: Response) -> Response:
 def post_process_response(response: Response) -> Response:
     """Sets the session cookie on the respective response."""
 
+    check_resolutions()
+
     # Do not override an already set session cookie i.e. on deletion.
     if "Set-Cookie" in response.headers:
         return response
@@ -0,0 +1,33 @@
+"""Pluggable session storage backends."""
+
+from functools import cache
+
+from cshsso.config import CONFIG
+from cshsso.sessionstore.api import SessionStore
+from cshsso.sessionstore.database import DatabaseStore
+from cshsso.sessionstore.memory import MemoryStore
+
+
+__all__ = ["SessionStore", "DatabaseStore", "MemoryStore", "get_store"]
+
+
+@cache
+def get_store(*, section: str = "session") -> SessionStore:
+    """Returns the session store as per the configuration."""
+
+    if (store := CONFIG.get(section, "store", fallback="database")) == "database":
+        return DatabaseStore()
+
+    if store == "memory":
+        return MemoryStore()
+
+    if store == "keyvalue":
+        # Optional dependency, only import when configured.
+        from cshsso.sessionstore.keyvalue import KeyValueStore
+
+        return KeyValueStore(
+            CONFIG.get(section, "url", fallback="redis://localhost:6379/0"),
+            prefix=CONFIG.get(section, "prefix", fallback="cshsso"),
+        )
+
+    raise NotImplementedError(f"Session store {store} is not implemented.")
@@ -0,0 +1,81 @@
+"""Session store interface."""
+
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Union
+
+from cshsso.exceptions import NotLoggedIn
+from cshsso.orm.functions import get_user
+from cshsso.orm.models import Session, User
+
+
+__all__ = ["SessionStore", "get_user_id", "load_session"]
+
+
+class SessionStore(ABC):
+    """Abstract base class for session storage backends."""
+
+    @abstractmethod
+    def get(self, session_id: int) -> Session:
+        """Returns the session with its user.
+
+        Raises NotLoggedIn if there is no such session.
+        """
+
+    @abstractmethod
+    def add(self, session: Session) -> Session:
+        """Stores a new session and assigns its ID."""
+
+    @abstractmethod
+    def extend(self, extensions: dict[int, datetime]) -> None:
+        """Sets the expiry dates of the given sessions."""
+
+    @abstractmethod
+    def save_secret(self, session: Session) -> None:
+        """Stores the secret hash of the given session."""
+
+    @abstractmethod
+    def delete(self, *session_ids: int) -> None:
+        """Deletes the given sessions."""
+
+    @abstractmethod
+    def purge(self, *, batch_size: int = 1000) -> int:
+        """Deletes expired sessions and returns the amount of deleted sessions."""
+
+    @abstractmethod
+    def delete_for_users(self, *users: Union[User, int]) -> dict[int, list[int]]:
+        """Deletes all sessions of the given users and
+        returns the IDs of the deleted sessions per user ID.
+        """
+
+    def delete_for_user(self, user: Union[User, int]) -> list[int]:
+        """Deletes all sessions of the given user
+        and returns the IDs of the deleted sessions.
+        """
+        return self.delete_for_users(user).get(get_user_id(user), [])
+
+
+def get_user_id(user: Union[User, int]) -> int:
+    """Returns the ID of the given user."""
+
+    return user if isinstance(user, int) else user.id
+
+
+def load_session(
+    session_id: int, user_id: int, secret: str, valid_until: datetime
+) -> Session:
+    """Creates a session object from stored
+    values and loads the respective user.
+    """
+
+    try:
+        user = get_user(user_id)
+    except User.DoesNotExist:
+        raise NotLoggedIn() from None
+
+    return Session(
+        id=session_id,
+        user=user,
+        secret=Session.secret.python_value(secret),
+        valid_until=valid_until,
+    )
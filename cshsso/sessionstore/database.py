@@ -0,0 +1,82 @@
+"""Relational database session store."""
+
+from datetime import datetime
+from typing import Union
+
+from peewee import JOIN, Case
+
+from cshsso.exceptions import NotLoggedIn
+from cshsso.orm.functions import delete_batched
+from cshsso.orm.models import DATABASE, Session, User, UserCommission
+from cshsso.sessionstore.api import SessionStore, get_user_id
+
+
+__all__ = ["DatabaseStore"]
+
+
+class DatabaseStore(SessionStore):
+    """Stores sessions in the CSH-SSO database."""
+
+    def get(self, session_id: int) -> Session:
+        try:
+            session = (
+                Session.select(Session, User, UserCommission)
+                .join(User)
+                .join(
+                    UserCommission,
+                    on=UserCommission.occupant == User.id,
+                    join_type=JOIN.LEFT_OUTER,
+                )
+                .group_by(Session)
+                .where(Session.id == session_id)
+                .get()
+            )
+        except Session.DoesNotExist:
+            raise NotLoggedIn() from None
+
+        session.user.snapshot_id = (session.user.id, session.user.revision)
+        return session
+
+    def add(self, session: Session) -> Session:
+        session.save()
+        return session
+
+    def extend(self, extensions: dict[int, datetime]) -> None:
+        Session.update(valid_until=Case(Session.id, list(extensions.items()))).where(
+            Session.id << set(extensions)
+        ).execute()
+
+    def save_secret(self, session: Session) -> None:
+        Session.update(secret=session.secret).where(Session.id == session.id).execute()
+
+    def delete(self, *session_ids: int) -> None:
+        Session.delete().where(Session.id << set(session_ids)).execute()
+
+    def purge(self, *, batch_size: int = 1000) -> int:
+        return delete_batched(Session, Session.valid_until <= datetime.now(), batch_size)
+
+    def delete_for_users(self, *users: Union[User, int]) -> dict[int, list[int]]:
+        user_ids = set(map(get_user_id, users))
+        terminated = {user_id: [] for user_id in user_ids}
+        condition = Session.user << user_ids
+
+        with DATABASE.atomic():
+            if DATABASE.returning_clause:
+                sessions = list(
+                    Session.delete()
+                    .where(condition)
+                    .returning(Session.id, Session.user)
+                    .execute()
+                )
+            else:
+                sessions = list(
+                    Session.select(Session.id, Session.user)
+                    .where(condition)
+                    .for_update()
+                )
+                Session.delete().where(condition).execute()
+
+        for session in sessions:
+            terminated[session.user_id].append(session.id)
+
+        return terminated
@@ -0,0 +1,166 @@
+"""Key-value session store using a Redis-compatible server."""
+
+from datetime import datetime
+from typing import Union
+
+from redis import Redis
+
+from cshsso.exceptions import NotLoggedIn
+from cshsso.orm.models import Session, User
+from cshsso.sessionstore.api import SessionStore, get_user_id, load_session
+
+
+__all__ = ["KeyValueStore"]
+
+
+FIELDS = {"user", "secret", "valid_until"}
+# Updates a field of a session hash and optionally its expiry,
+# unless the session has been deleted or has expired meanwhile.
+UPDATE_EXISTING = """
+if redis.call("EXISTS", KEYS[1]) == 0 then
+    return 0
+end
+redis.call("HSET", KEYS[1], ARGV[1], ARGV[2])
+if ARGV[3] then
+    redis.call("EXPIREAT", KEYS[1], ARGV[3])
+end
+return 1
+"""
+
+
+class KeyValueStore(SessionStore):
+    """Stores sessions on a Redis-compatible key-value server.
+
+    Each session is a hash that expires along with the session.
+    """
+
+    def __init__(self, url: str, *, prefix: str = "cshsso"):
+        self.client = Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self._update_existing = self.client.register_script(UPDATE_EXISTING)
+
+    def _session_key(self, session_id: int) -> str:
+        """Returns the key of the given session."""
+        return f"{self.prefix}:session:{session_id}"
+
+    def _user_key(self, user_id: int) -> str:
+        """Returns the key of the set of the given user's sessions."""
+        return f"{self.prefix}:user-sessions:{user_id}"
+
+    def get(self, session_id: int) -> Session:
+        record = self.client.hgetall(self._session_key(session_id))
+
+        # Treat partially written sessions as missing.
+        if not FIELDS <= record.keys():
+            raise NotLoggedIn()
+
+        return load_session(
+            session_id,
+            int(record["user"]),
+            record["secret"],
+            datetime.fromisoformat(record["valid_until"]),
+        )
+
+    def add(self, session: Session) -> Session:
+        session.id = self.client.incr(f"{self.prefix}:session-id")
+        key = self._session_key(session.id)
+        pipeline = self.client.pipeline()
+        pipeline.hset(
+            key,
+            mapping={
+                "user": session.user_id,
+                "secret": Session.secret.db_value(session.secret),
+                "valid_until": session.valid_until.isoformat(),
+            },
+        )
+        pipeline.expireat(key, session.valid_until)
+        pipeline.sadd(self._user_key(session.user_id), session.id)
+        pipeline.execute()
+        return session
+
+    def extend(self, extensions: dict[int, datetime]) -> None:
+        pipeline = self.client.pipeline()
+
+        for session_id, valid_until in extensions.items():
+            self._update_existing(
+                keys=[self._session_key(session_id)],
+                args=[
+                    "valid_until",
+                    valid_until.isoformat(),
+                    int(valid_until.timestamp()),
+                ],
+                client=pipeline,
+            )
+
+        pipeline.execute()
+
+    def save_secret(self, session: Session) -> None:
+        self._update_existing(
+            keys=[self._session_key(session.id)],
+            args=["secret", Session.secret.db_value(session.secret)],
+        )
+
+    def delete(self, *session_ids: int) -> None:
+        pipeline = self.client.pipeline()
+
+        for session_id in session_ids:
+            pipeline.hget(self._session_key(session_id), "user")
+
+        users = pipeline.execute()
+        pipeline = self.client.pipeline()
+
+        for session_id, user_id in zip(session_ids, users):
+            pipeline.delete(self._session_key(session_id))
+
+            if user_id is not None:
+                pipeline.srem(self._user_key(user_id), session_id)
+
+        pipeline.execute()
+
+    def purge(self, *, batch_size: int = 1000) -> int:
+        """Session keys expire on the server, so only the entries
+        of expired sessions are removed from the users' session sets.
+
+        Returns the amount of removed entries.
+        """
+        removed = 0
+
+        for user_key in self.client.scan_iter(
+            match=f"{self.prefix}:user-sessions:*", count=batch_size
+        ):
+            sessions = list(self.client.smembers(user_key))
+            pipeline = self.client.pipeline()
+
+            for session_id in sessions:
+                pipeline.exists(self._session_key(session_id))
+
+            if expired := [
+                session_id
+                for session_id, exists in zip(sessions, pipeline.execute())
+                if not exists
+            ]:
+                removed += self.client.srem(user_key, *expired)
+
+        return removed
+
+    def delete_for_users(self, *users: Union[User, int]) -> dict[int, list[int]]:
+        user_ids = list(map(get_user_id, users))
+        pipeline = self.client.pipeline()
+
+        for user_id in user_ids:
+            pipeline.smembers(self._user_key(user_id))
+
+        terminated = {
+            user_id: sorted(map(int, sessions))
+            for user_id, sessions in zip(user_ids, pipeline.execute())
+        }
+        pipeline = self.client.pipeline()
+
+        for user_id, sessions in terminated.items():
+            for session_id in sessions:
+                pipeline.delete(self._session_key(session_id))
+
+            pipeline.delete(self._user_key(user_id))
+
+        pipeline.execute()
+        return terminated
@@ -0,0 +1,102 @@
+"""In-memory session store for single-process deployments."""
+
+from datetime import datetime
+from itertools import count
+from threading import Lock
+from typing import NamedTuple, Union
+
+from cshsso.exceptions import NotLoggedIn
+from cshsso.orm.models import Session, User
+from cshsso.sessionstore.api import SessionStore, get_user_id, load_session
+
+
+__all__ = ["MemoryStore"]
+
+
+class SessionRecord(NamedTuple):
+    """A stored session."""
+
+    user: int
+    secret: str
+    valid_until: datetime
+
+
+class MemoryStore(SessionStore):
+    """Stores sessions in the memory of the current process."""
+
+    def __init__(self):
+        self._ids = count(1)
+        self._sessions: dict[int, SessionRecord] = {}
+        self._user_sessions: dict[int, set[int]] = {}
+        self._lock = Lock()
+
+    def get(self, session_id: int) -> Session:
+        with self._lock:
+            try:
+                record = self._sessions[session_id]
+            except KeyError:
+                raise NotLoggedIn() from None
+
+        return load_session(session_id, *record)
+
+    def add(self, session: Session) -> Session:
+        record = SessionRecord(
+            session.user_id,
+            Session.secret.db_value(session.secret),
+            session.valid_until,
+        )
+
+        with self._lock:
+            session.id = next(self._ids)
+            self._sessions[session.id] = record
+            self._user_sessions.setdefault(record.user, set()).add(session.id)
+
+        return session
+
+    def extend(self, extensions: dict[int, datetime]) -> None:
+        with self._lock:
+            for session_id, valid_until in extensions.items():
+                if (record := self._sessions.get(session_id)) is not None:
+                    self._sessions[session_id] = record._replace(
+                        valid_until=valid_until
+                    )
+
+    def save_secret(self, session: Session) -> None:
+        with self._lock:
+            if (record := self._sessions.get(session.id)) is not None:
+                self._sessions[session.id] = record._replace(
+                    secret=Session.secret.db_value(session.secret)
+                )
+
+    def delete(self, *session_ids: int) -> None:
+        with self._lock:
+            for session_id in session_ids:
+                if (record := self._sessions.pop(session_id, None)) is not None:
+                    self._user_sessions.get(record.user, set()).discard(session_id)
+
+    def purge(self, *, batch_size: int = 1000) -> int:
+        now = datetime.now()
+
+        with self._lock:
+            expired = [
+                session_id
+                for session_id, record in self._sessions.items()
+                if record.valid_until <= now
+            ]
+
+        self.delete(*expired)
+        return len(expired)
+
+    def delete_for_users(self, *users: Union[User, int]) -> dict[int, list[int]]:
+        terminated = {}
+
+        with self._lock:
+            for user_id in map(get_user_id, users):
+                sessions = self._user_sessions.pop(user_id, set())
+
+                for session_id in sessions:
+                    self._sessions.pop(session_id, None)
+
+                terminated[user_id] = sorted(sessions)
+
+        return terminated
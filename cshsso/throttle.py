@@ -0,0 +1,209 @@
+"""Throttling of login attempts."""
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import cache
+from math import ceil
+from threading import Lock
+from time import monotonic, time
+from typing import NamedTuple, Optional
+
+from cshsso.config import CONFIG
+
+
+__all__ = [
+    "ThrottleInfo",
+    "Limiter",
+    "MemoryLimiter",
+    "RedisLimiter",
+    "allow_login",
+    "throttle_info",
+]
+
+
+TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call("HMGET", KEYS[1], "tokens", "updated")
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call("HSET", KEYS[1], "tokens", tokens, "updated", now)
+redis.call("EXPIRE", KEYS[1], ARGV[4])
+return allowed
+"""
+
+
+class ThrottleInfo(NamedTuple):
+    """Throttling statistics."""
+
+    allowed: int
+    rejected: int
+    buckets: Optional[int]
+    maxsize: Optional[int]
+
+    def to_json(self) -> dict[str, Optional[int]]:
+        """Returns a JSON-ish dict."""
+        return self._asdict()
+
+
+class Limiter(ABC):
+    """Abstract token bucket rate limiter.
+
+    Each key may perform up to capacity attempts in a burst.
+    One attempt is regained every interval seconds.
+    """
+
+    def __init__(self, capacity: int, interval: float):
+        self.capacity = capacity
+        self.interval = interval
+        self.allowed = 0
+        self.rejected = 0
+        self._counter_lock = Lock()
+
+    @property
+    def rate(self) -> float:
+        """Returns the amount of tokens regained per second."""
+        return 1 / self.interval
+
+    @abstractmethod
+    def take(self, key: str) -> bool:
+        """Takes a token from the key's bucket if available."""
+
+    def allow(self, key: str) -> bool:
+        """Determines whether an attempt for the given key is allowed."""
+        allowed = self.take(key)
+
+        with self._counter_lock:
+            if allowed:
+                self.allowed += 1
+            else:
+                self.rejected += 1
+
+        return allowed
+
+    def info(self) -> ThrottleInfo:
+        """Returns the throttling statistics."""
+        return ThrottleInfo(self.allowed, self.rejected, None, None)
+
+
+class MemoryLimiter(Limiter):
+    """Rate limiter keeping its buckets in the current process.
+
+    The least recently used buckets are evicted when exceeding maxsize.
+    """
+
+    def __init__(self, capacity: int, interval: float, maxsize: int = 10000):
+        super().__init__(capacity, interval)
+        self.maxsize = maxsize
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = Lock()
+
+    def take(self, key: str) -> bool:
+        now = monotonic()
+
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+
+            if allowed := tokens >= 1:
+                tokens -= 1
+
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+
+            if len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+
+        return allowed
+
+    def info(self) -> ThrottleInfo:
+        with self._lock:
+            buckets = len(self._buckets)
+
+        return ThrottleInfo(self.allowed, self.rejected, buckets, self.maxsize)
+
+
+class RedisLimiter(Limiter):
+    """Rate limiter sharing its buckets between
+    processes on a Redis-compatible server.
+    """
+
+    def __init__(
+        self, url: str, capacity: int, interval: float, *, prefix: str = "cshsso"
+    ):
+        # Optional dependency, only import when configured.
+        from redis import Redis
+
+        super().__init__(capacity, interval)
+        self.prefix = prefix
+        self._script = Redis.from_url(url).register_script(TOKEN_BUCKET)
+
+    def take(self, key: str) -> bool:
+        return bool(
+            self._script(
+                keys=[f"{self.prefix}:throttle:{key}"],
+                args=[
+                    self.capacity,
+                    self.rate,
+                    time(),
+                    ceil(self.capacity * self.interval),
+                ],
+            )
+        )
+
+
+@cache
+def get_limiter(*, section: str = "throttle") -> Optional[Limiter]:
+    """Returns the login rate limiter as per the configuration.
+
+    Throttling is disabled unless enabled explicitly, since clients behind
+    a shared address, e.g. a reverse proxy or NAT, share their buckets.
+    """
+
+    if not CONFIG.getboolean(section, "enabled", fallback=False):
+        return None
+
+    capacity = CONFIG.getint(section, "capacity", fallback=5)
+    interval = CONFIG.getfloat(section, "interval", fallback=60)
+
+    if CONFIG.get(section, "backend", fallback="memory") == "redis":
+        return RedisLimiter(
+            CONFIG.get(section, "url", fallback="redis://localhost:6379/0"),
+            capacity,
+            interval,
+            prefix=CONFIG.get(section, "prefix", fallback="cshsso"),
+        )
+
+    return MemoryLimiter(
+        capacity, interval, CONFIG.getint(section, "maxsize", fallback=10000)
+    )
+
+
+def allow_login(email: str, address: Optional[str]) -> bool:
+    """Determines whether a login attempt for the
+    given email address and remote address is allowed.
+    """
+
+    if (limiter := get_limiter()) is None:
+        return True
+
+    if address is not None and not limiter.allow(f"address:{address}"):
+        return False
+
+    return limiter.allow(f"email:{email.casefold()}")
+
+
+def throttle_info() -> Optional[ThrottleInfo]:
+    """Returns the login throttling statistics, if enabled."""
+
+    if (limiter := get_limiter()) is None:
+        return None
+
+    return limiter.info()
@@ -0,0 +1,281 @@
+"""Stateless, signed session tokens."""
+
+from __future__ import annotations
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from datetime import datetime
+from functools import cache
+from hashlib import sha256
+from hmac import compare_digest, new
+from json import dumps, loads
+from secrets import randbits
+from threading import Lock
+from time import monotonic
+from typing import NamedTuple, Optional, Union
+
+from cshsso.config import CONFIG
+from cshsso.constants import SESSION_VALIDITY
+from cshsso.exceptions import NotLoggedIn
+from cshsso.orm.models import Revocation, Session, User, UserCommission
+from cshsso.roles import Commission, Status
+
+
+__all__ = [
+    "TokenClaims",
+    "issue_token",
+    "verify_token",
+    "revoke_token",
+    "revoke_user",
+    "revoke_users",
+]
+
+
+class SigningKeys(NamedTuple):
+    """Available signing keys and the ID of the active one."""
+
+    keys: dict[str, bytes]
+    active: str
+
+    @classmethod
+    def from_config(cls, *, section: str = "tokens") -> SigningKeys:
+        """Loads the signing keys from the configuration.
+
+        Keys are configured as space-separated <id>:<base64 secret> pairs.
+        All keys are accepted for verification, but only the active one is used
+        for signing, so that keys can be rotated without invalidating sessions.
+        """
+        keys = {}
+
+        for item in CONFIG.get(section, "keys").split():
+            kid, secret = item.split(":", maxsplit=1)
+            keys[kid] = urlsafe_b64decode(secret)
+
+        if not keys:
+            raise ValueError(f"No signing keys configured in section [{section}].")
+
+        return cls(keys, CONFIG.get(section, "active", fallback=next(iter(keys))))
+
+    @property
+    def signing_key(self) -> bytes:
+        """Returns the active signing key."""
+        return self.keys[self.active]
+
+
+class TokenClaims(NamedTuple):
+    """Claims carried by a session token."""
+
+    id: int
+    user: int
+    status: str
+    commissions: list[str]
+    admin: bool
+    version: int
+    issued: float
+    expires: float
+
+    @classmethod
+    def for_user(cls, user: User, token_id: Optional[int] = None) -> TokenClaims:
+        """Creates claims for the given user.
+
+        Refreshed tokens keep the ID of the token they replace,
+        so that revoking the ID revokes all of its predecessors.
+        """
+        return cls(
+            randbits(63) if token_id is None else token_id,
+            user.id,
+            # .name would return the role's display name of the tuple.
+            user.status._name_,
+            sorted(commission._name_ for commission in user.commissions),
+            user.admin,
+            user.permissions_version,
+            (now := datetime.now()).timestamp(),
+            (now + SESSION_VALIDITY).timestamp(),
+        )
+
+    @property
+    def valid_until(self) -> datetime:
+        """Returns the expiry date."""
+        return datetime.fromtimestamp(self.expires)
+
+    def needs_refresh(self, *, section: str = "tokens") -> bool:
+        """Determines whether the claims are older than the refresh interval."""
+        return (
+            datetime.now().timestamp() - self.issued
+            > CONFIG.getfloat(section, "refresh_interval", fallback=300)
+        )
+
+    def to_user(self) -> User:
+        """Returns a user object carrying only the claimed data.
+
+        The user object must not be saved.
+        """
+        user = User(
+            id=self.user,
+            status=Status[self.status],
+            admin=self.admin,
+            permissions_version=self.version,
+            verified=True,
+            locked=False,
+            failed_logins=0,
+        )
+        user.user_commissions = [
+            UserCommission(occupant=self.user, commission=Commission[commission])
+            for commission in self.commissions
+        ]
+        return user
+
+    def to_session(self) -> Session:
+        """Returns a session object from the claims."""
+        session = Session(id=self.id, user=self.to_user(), valid_until=self.valid_until)
+        session.stateless = True
+        session.user_loaded = False
+        return session
+
+
+class RevocationList:
+    """Locally cached list of revoked tokens and users."""
+
+    def __init__(self, interval: float = 10):
+        self.interval = interval
+        self._tokens: set[int] = set()
+        self._users: dict[int, float] = {}
+        self._loaded = float("-inf")
+        self._lock = Lock()
+
+    def _refresh(self) -> None:
+        """Reloads the revocations from the database if outdated."""
+        if monotonic() - self._loaded < self.interval:
+            return
+
+        tokens, users = set(), {}
+
+        for revocation in Revocation.select().where(
+            Revocation.expires > datetime.now()
+        ):
+            if revocation.token is not None:
+                tokens.add(revocation.token)
+
+            if revocation.user_id is not None:
+                users[revocation.user_id] = max(
+                    users.get(revocation.user_id, float("-inf")),
+                    revocation.revoked.timestamp(),
+                )
+
+        self._tokens, self._users, self._loaded = tokens, users, monotonic()
+
+    def add_token(self, token: int) -> None:
+        """Adds a revoked token."""
+        with self._lock:
+            self._tokens.add(token)
+
+    def add_user(self, user: int, revoked: float) -> None:
+        """Adds a user whose tokens are revoked."""
+        with self._lock:
+            self._users[user] = max(self._users.get(user, float("-inf")), revoked)
+
+    def is_revoked(self, claims: TokenClaims) -> bool:
+        """Checks whether the given claims have been revoked."""
+        with self._lock:
+            self._refresh()
+
+            if claims.id in self._tokens:
+                return True
+
+            return claims.issued <= self._users.get(claims.user, float("-inf"))
+
+
+@cache
+def get_signing_keys() -> SigningKeys:
+    """Returns the configured signing keys."""
+
+    return SigningKeys.from_config()
+
+
+@cache
+def get_revocations(*, section: str = "tokens") -> RevocationList:
+    """Returns the revocation list."""
+
+    return RevocationList(CONFIG.getfloat(section, "revocation_refresh", fallback=10))
+
+
+def b64encode(data: bytes) -> str:
+    """Encodes the data as URL-safe base64 without padding."""
+
+    return urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def b64decode(data: str) -> bytes:
+    """Decodes URL-safe base64 without padding."""
+
+    return urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def sign(key: bytes, message: str) -> bytes:
+    """Signs the message with the given key."""
+
+    return new(key, message.encode(), sha256).digest()
+
+
+def issue_token(
+    user: User, token_id: Optional[int] = None
+) -> tuple[TokenClaims, str]:
+    """Issues a token for the given user, optionally replacing the given token."""
+
+    claims = TokenClaims.for_user(user, token_id)
+    keys = get_signing_keys()
+    message = f"{keys.active}.{b64encode(dumps(claims).encode())}"
+    return claims, f"{message}.{b64encode(sign(keys.signing_key, message))}"
+
+
+def verify_token(token: str) -> TokenClaims:
+    """Verifies the token and returns its claims."""
+
+    try:
+        message, signature = token.rsplit(".", maxsplit=1)
+        kid, payload = message.split(".", maxsplit=1)
+        key = get_signing_keys().keys[kid]
+    except (KeyError, ValueError):
+        raise NotLoggedIn() from None
+
+    try:
+        if not compare_digest(sign(key, message), b64decode(signature)):
+            raise NotLoggedIn()
+
+        claims = TokenClaims(*loads(b64decode(payload)))
+    except (BinasciiError, TypeError, ValueError):
+        raise NotLoggedIn() from None
+
+    if claims.expires <= datetime.now().timestamp():
+        raise NotLoggedIn()
+
+    if get_revocations().is_revoked(claims):
+        raise NotLoggedIn()
+
+    return claims
+
+
+def revoke_token(token: int, *, expires: datetime = None) -> None:
+    """Revokes the token with the given ID."""
+
+    expires = expires or datetime.now() + SESSION_VALIDITY
+    Revocation(token=token, expires=expires).save()
+    get_revocations().add_token(token)
+
+
+def revoke_user(user: Union[User, int]) -> None:
+    """Revokes all tokens issued to the given user until now."""
+
+    revoke_users(user)
+
+
+def revoke_users(*users: Union[User, int]) -> None:
+    """Revokes all tokens issued to the given users until now."""
+
+    revocations = [
+        Revocation(user=user, expires=datetime.now() + SESSION_VALIDITY)
+        for user in users
+    ]
+    Revocation.bulk_create(revocations)
+
+    for revocation in revocations:
+        get_revocations().add_user(revocation.user_id, revocation.revoked.timestamp())
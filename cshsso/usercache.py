@@ -0,0 +1,105 @@
+"""Cache of user records."""
+
+from functools import cache
+from threading import Lock
+from typing import Any, NamedTuple, Optional
+
+from cshsso.cache import CacheInfo, LRUCache
+from cshsso.config import CONFIG
+
+
+__all__ = [
+    "UserSnapshot",
+    "UserCache",
+    "get_user_cache",
+    "forget_user",
+    "user_cache_info",
+]
+
+
+class UserSnapshot(NamedTuple):
+    """Stored field values of a user and its commissions.
+
+    A user of None denotes a user that does not exist.
+    """
+
+    version: int
+    user: Optional[dict[str, Any]]
+    commissions: tuple[dict[str, Any], ...] = ()
+
+
+class UserCache:
+    """LRU cache of user snapshots.
+
+    Each user ID has a version, which is incremented whenever the
+    user or its commissions change in this process. Snapshots loaded
+    before a change carry an older version and are discarded.
+    Changes made by other processes are detected by get_user(),
+    which compares a snapshot's revision with the stored one.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, negative_ttl: float):
+        self.negative_ttl = negative_ttl
+        self._snapshots = LRUCache(maxsize, ttl)
+        self._versions: dict[int, int] = {}
+        self._lock = Lock()
+
+    def version(self, uid: int) -> int:
+        """Returns the current version of the user."""
+        return self._versions.get(uid, 0)
+
+    def get(self, uid: int) -> Optional[UserSnapshot]:
+        """Returns the current snapshot of the user, if cached."""
+        if (snapshot := self._snapshots.get(uid)) is None:
+            return None
+
+        if snapshot.version != self.version(uid):
+            return None
+
+        return snapshot
+
+    def set(self, uid: int, snapshot: UserSnapshot) -> None:
+        """Caches the snapshot unless the user changed meanwhile."""
+        with self._lock:
+            if snapshot.version != self.version(uid):
+                return
+
+            self._snapshots.set(
+                uid,
+                snapshot,
+                ttl=self.negative_ttl if snapshot.user is None else None,
+            )
+
+    def forget(self, uid: int) -> None:
+        """Invalidates the snapshot of the user."""
+        with self._lock:
+            self._versions[uid] = self.version(uid) + 1
+            self._snapshots.pop(uid)
+
+    def info(self) -> CacheInfo:
+        """Returns the cache statistics."""
+        return self._snapshots.info()
+
+
+@cache
+def get_user_cache(*, section: str = "user") -> UserCache:
+    """Returns the user cache."""
+
+    return UserCache(
+        CONFIG.getint(section, "cache_size", fallback=4096),
+        CONFIG.getfloat(section, "cache_ttl", fallback=60),
+        CONFIG.getfloat(section, "negative_cache_ttl", fallback=10),
+    )
+
+
+def forget_user(uid: Optional[int]) -> None:
+    """Invalidates the cached record of the given user."""
+
+    if uid is not None:
+        get_user_cache().forget(uid)
+
+
+def user_cache_info() -> CacheInfo:
+    """Returns statistics of the user cache."""
+
+    return get_user_cache().info()
@@ -0,0 +1,84 @@
+"""Write-behind buffering of session extensions."""
+
+from atexit import register
+from datetime import datetime
+from logging import getLogger
+from threading import Event, Lock, Thread
+from typing import Callable, Optional
+
+
+__all__ = ["ExtensionBuffer"]
+
+
+LOGGER = getLogger("cshsso")
+
+
+Flusher = Callable[[dict[int, datetime]], None]
+
+
+class ExtensionBuffer:
+    """Buffers session extensions in memory and
+    flushes them in batches at a fixed interval.
+
+    Buffered extensions only ever push the expiry date further into the future.
+    Losing them, e.g. on a crash, thus makes a session expire earlier, never later.
+    """
+
+    def __init__(self, flusher: Flusher, interval: float = 30):
+        self.flusher = flusher
+        self.interval = interval
+        self._pending: dict[int, datetime] = {}
+        self._lock = Lock()
+        self._stopped = Event()
+        self._thread = Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        """Starts the background flushing."""
+        self._thread.start()
+        register(self.stop)
+
+    def stop(self) -> None:
+        """Stops the background flushing and flushes pending extensions."""
+        self._stopped.set()
+        self.flush()
+
+    def add(self, session_id: int, valid_until: datetime) -> None:
+        """Buffers an extension of the given session."""
+        with self._lock:
+            if (pending := self._pending.get(session_id)) is None:
+                self._pending[session_id] = valid_until
+            else:
+                self._pending[session_id] = max(pending, valid_until)
+
+    def get(self, session_id: int) -> Optional[datetime]:
+        """Returns the buffered expiry date of the given session."""
+        with self._lock:
+            return self._pending.get(session_id)
+
+    def discard(self, *session_ids: int) -> None:
+        """Discards pending extensions of the given sessions."""
+        with self._lock:
+            for session_id in session_ids:
+                self._pending.pop(session_id, None)
+
+    def flush(self) -> None:
+        """Writes all pending extensions."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        if not pending:
+            return
+
+        try:
+            self.flusher(pending)
+        except Exception as error:
+            LOGGER.error("Could not flush %i session extensions.", len(pending))
+            LOGGER.exception(error)
+
+            for session_id, valid_until in pending.items():
+                self.add(session_id, valid_until)
+
+    def _run(self) -> None:
+        """Flushes pending extensions until stopped."""
+        while not self._stopped.wait(self.interval):
+            self.flush()
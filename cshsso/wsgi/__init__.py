@@ -6,14 +6,21 @@ from cshsso.wsgi.account import patch as patch_account
 from cshsso.wsgi.account import delete as delete_account
 from cshsso.wsgi.account import set_status
 from cshsso.wsgi.account import set_commissions
+from cshsso.wsgi.authorization import check_authorizations
+from cshsso.wsgi.commissions import set_commission_holders
 from cshsso.wsgi.login import login
 from cshsso.wsgi.logout import logout
+from cshsso.wsgi.mailinglist import show_mailing_list
+from cshsso.wsgi.mailinglist import show_mailing_list_changes
+from cshsso.wsgi.logout import terminate
 from cshsso.wsgi.pwreset import request_pw_reset, confirm_pw_reset
 from cshsso.wsgi.register import register, confirm_registration
 from cshsso.wsgi.roles import list_circles
 from cshsso.wsgi.roles import list_commissions
 from cshsso.wsgi.roles import list_commission_groups
 from cshsso.wsgi.roles import list_status
+from cshsso.wsgi.stats import show_stats
+from cshsso.wsgi.users import list_members
 
 
 __all__ = ["APPLICATION"]
@@ -22,6 +29,7 @@ __all__ = ["APPLICATION"]
 APPLICATION = Application("CSHSSO")
 APPLICATION.route("/login", methods=["POST"])(login)
 APPLICATION.route("/logout", methods=["POST"])(logout)
+APPLICATION.route("/sessions/terminate", methods=["POST"])(terminate)
 APPLICATION.route("/pwreset", methods=["POST"])(request_pw_reset)
 APPLICATION.route("/pwreset/confirm", methods=["POST"])(confirm_pw_reset)
 APPLICATION.route("/register", methods=["POST"])(register)
@@ -31,7 +39,13 @@ APPLICATION.route("/account", methods=["PATCH"])(patch_account)
 APPLICATION.route("/account/delete", methods=["POST"])(delete_account)
 APPLICATION.route("/account/status", methods=["POST"])(set_status)
 APPLICATION.route("/account/commissions", methods=["POST"])(set_commissions)
+APPLICATION.route("/authorization", methods=["POST"])(check_authorizations)
+APPLICATION.route("/commissions", methods=["POST"])(set_commission_holders)
+APPLICATION.route("/mailinglist", methods=["GET"])(show_mailing_list)
+APPLICATION.route("/mailinglist/changes", methods=["GET"])(show_mailing_list_changes)
 APPLICATION.route("/roles/circles", methods=["GET"])(list_circles)
 APPLICATION.route("/roles/commissions", methods=["GET"])(list_commissions)
 APPLICATION.route("/roles/commission-groups", methods=["GET"])(list_commission_groups)
 APPLICATION.route("/roles/status", methods=["GET"])(list_status)
+APPLICATION.route("/stats", methods=["GET"])(show_stats)
+APPLICATION.route("/users", methods=["GET"])(list_members)
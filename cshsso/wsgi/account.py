@@ -1,19 +1,19 @@
 """Manage accounts."""
 
-from flask import request
+from flask import request, Response
 
-from wsgilib import JSON, JSONMessage
+from wsgilib import JSONMessage
 
 from cshsso.decorators import authenticated, Authorization
 from cshsso.exceptions import InvalidPassword
 from cshsso.functions import date_or_none
-from cshsso.localproxies import SESSION, USER
+from cshsso.localproxies import ACTOR, TARGET, USER
 from cshsso.orm.functions import delete_user
-from cshsso.orm.functions import get_current_user
-from cshsso.orm.functions import user_to_json
 from cshsso.orm.functions import patch_user
 from cshsso.orm.functions import set_commissions as _set_commissions
 from cshsso.roles import Commission, Status
+from cshsso.serializer import encode_user, parse_fields
+from cshsso.tokens import revoke_user
 
 
 __all__ = [
@@ -28,11 +28,18 @@ __all__ = [
 
 
 @authenticated
-def show() -> JSON:
+def show() -> Response:
     """Shows the user's profile."""
 
     with USER as user:
-        return JSON(user_to_json(user, actor=SESSION.user))
+        return Response(
+            encode_user(
+                user,
+                actor=ACTOR,
+                fields=parse_fields(request.args.get("fields")),
+            ),
+            mimetype="application/json",
+        )
 
 
 @authenticated
@@ -40,9 +47,18 @@ def patch() -> JSONMessage:
     """Updates the user's profile."""
 
     with USER as user:
-        user = patch_user(user, request.json, actor=SESSION.user)
+        claimed = (user.status, user.admin)
+        user = patch_user(user, request.json, actor=ACTOR)
 
     user.save()
+
+    if ACTOR.admin:
+        user.bump_permissions_version()
+
+        # Tokens must not keep claiming outdated permissions.
+        if user.locked or (user.status, user.admin) != claimed:
+            revoke_user(user)
+
     return JSONMessage("User patched.", status=200)
 
 
@@ -52,7 +68,7 @@ def delete() -> JSONMessage:
 
     try:
         with USER as user:
-            delete_user(user, actor=SESSION.user, passwd=request.json.get("passwd"))
+            delete_user(user, actor=ACTOR, passwd=request.json.get("passwd"))
     except InvalidPassword:
         return JSONMessage("Invalid password provided.", status=403)
 
@@ -110,9 +126,11 @@ def set_status() -> JSONMessage:
     except KeyError:
         return JSONMessage("Invalid status provided.", status=400)
 
-    user = get_current_user(SESSION, allow_other=True)
-    old_status, user.status = user.status, status
-    user.save()
+    with TARGET as user:
+        old_status, user.status = user.status, status
+        user.save()
+        user.bump_permissions_version()
+
     return JSONMessage(
         "Status updated.", old=old_status.to_json(), new=status.to_json(), status=200
     )
@@ -124,15 +142,20 @@ def set_commissions() -> JSONMessage:
     """Sets the commissions for a user."""
 
     try:
-        commissions = {Commission[c] for c in request.json["commissions"]}
+        commissions = request.json["commissions"]
     except KeyError:
         return JSONMessage("No commissions provided.", status=400)
-    except ValueError:
+
+    try:
+        commissions = {Commission[c] for c in commissions}
+    except (KeyError, TypeError):
         return JSONMessage("Invalid commission provided.", status=400)
 
-    _set_commissions(USER, commissions)
+    with TARGET as user:
+        _set_commissions(user, commissions)
+
     return JSONMessage(
         "Commissions updated.",
-        commissions={c.to_json() for c in commissions},
+        commissions=[c.to_json() for c in commissions],
         status=200,
     )
@@ -0,0 +1,31 @@
+"""Batch authorization checks."""
+
+from flask import request
+
+from wsgilib import JSON, JSONMessage
+
+from cshsso.decorators import authenticated, Authorization
+from cshsso.roster import authorize_users
+
+
+__all__ = ["check_authorizations"]
+
+
+@authenticated
+@Authorization.OUTER
+def check_authorizations() -> JSON:
+    """Checks the given authorizations for the given users."""
+
+    try:
+        user_ids = {int(user_id) for user_id in request.json["users"]}
+    except KeyError:
+        return JSONMessage("No users specified.", status=400)
+    except (TypeError, ValueError):
+        return JSONMessage("Invalid user ID provided.", status=400)
+
+    try:
+        checks = {Authorization[check] for check in request.json["checks"]}
+    except KeyError:
+        return JSONMessage("No or invalid checks specified.", status=400)
+
+    return JSON(authorize_users(user_ids, checks))
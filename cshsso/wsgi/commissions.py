@@ -0,0 +1,39 @@
+"""Manage commission holders."""
+
+from flask import request
+from peewee import IntegrityError
+
+from wsgilib import JSONMessage
+
+from cshsso.decorators import authenticated, Authorization
+from cshsso.orm.functions import set_holders
+from cshsso.roles import Commission
+
+
+__all__ = ["set_commission_holders"]
+
+
+@authenticated
+@Authorization.CHARGES
+def set_commission_holders() -> JSONMessage:
+    """Sets the holders of multiple commissions at once."""
+
+    if not isinstance(request.json, dict):
+        return JSONMessage("No commission holders provided.", status=400)
+
+    try:
+        holders = {
+            Commission[commission]: None if user_id is None else int(user_id)
+            for commission, user_id in request.json.items()
+        }
+    except KeyError:
+        return JSONMessage("Invalid commission provided.", status=400)
+    except (TypeError, ValueError):
+        return JSONMessage("Invalid user ID provided.", status=400)
+
+    try:
+        affected = set_holders(holders)
+    except IntegrityError:
+        return JSONMessage("No such user.", status=404)
+
+    return JSONMessage("Commission holders updated.", users=sorted(affected), status=200)
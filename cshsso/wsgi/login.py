@@ -1,13 +1,16 @@
 """User login."""
 
-from typing import Union
+from typing import Optional, Union
 
 from flask import request, Response, make_response
 
 from wsgilib import JSONMessage
 
+from cshsso.config import CONFIG
 from cshsso.orm.models import User
+from cshsso.passwords import login as login_user
 from cshsso.session import for_user, set_session_cookies
+from cshsso.throttle import allow_login
 
 
 __all__ = ["login"]
@@ -16,6 +19,23 @@ __all__ = ["login"]
 INVALID_USER_NAME_OR_PASSWORD = JSONMessage(
     "Invalid user name or password.", status=403
 )
+TOO_MANY_ATTEMPTS = JSONMessage("Too many login attempts.", status=429)
+
+
+def get_client_address(*, section: str = "throttle") -> Optional[str]:
+    """Returns the client's address.
+
+    Behind the configured amount of trusted reverse proxies, the address
+    is taken from the X-Forwarded-For entry added by the outermost one.
+    """
+
+    if (proxies := CONFIG.getint(section, "proxies", fallback=0)) and (
+        forwarded := request.headers.get("X-Forwarded-For")
+    ):
+        if len(addresses := [a.strip() for a in forwarded.split(",")]) >= proxies:
+            return addresses[-proxies]
+
+    return request.remote_addr
 
 
 def login() -> Union[JSONMessage, Response]:
@@ -33,6 +53,9 @@ def login() -> Union[JSONMessage, Response]:
     if not (passwd := request.json.get("passwd")):
         return JSONMessage("No password provided.", status=400)
 
+    if not allow_login(email, get_client_address()):
+        return TOO_MANY_ATTEMPTS
+
     try:
         user = User.get(User.email == email)
     except User.DoesNotExist:
@@ -41,11 +64,10 @@ def login() -> Union[JSONMessage, Response]:
     if user.disabled:
         return INVALID_USER_NAME_OR_PASSWORD
 
-    if not user.login(passwd):
+    if not login_user(user, passwd):
         return INVALID_USER_NAME_OR_PASSWORD
 
     session, secret = for_user(user)
-    session.save()
     return set_session_cookies(
         make_response(JSONMessage("Login successful.", status=200)),
         session,
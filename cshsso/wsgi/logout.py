@@ -1,32 +1,33 @@
 """Handle logouts."""
 
+from typing import Union
+
 from flask import request, Response, jsonify, make_response
 
-from cshsso.decorators import authenticated
+from wsgilib import JSON, JSONMessage
+
+from cshsso.decorators import admin, authenticated
 from cshsso.localproxies import USER, SESSION
 from cshsso.orm.models import User, Session
 from cshsso.session import delete_session_cookies
+from cshsso.session import terminate_sessions
+from cshsso.session import terminate_user_sessions
 
 
-__all__ = ["logout"]
+__all__ = ["logout", "terminate"]
 
 
 def terminate_all_sessions(user: User) -> Response:
     """Terminates all sessions of the given user."""
 
-    sessions = []
-
-    for session in Session.select().where(Session.user == user):
-        sessions.append(session.id)
-        session.delete_instance()
-
+    sessions = terminate_user_sessions(user).get(user.id, [])
     return delete_session_cookies(make_response(jsonify(sessions)))
 
 
 def terminate_session(session: Session) -> Response:
     """Terminates the given session."""
 
-    session.delete_instance()
+    terminate_sessions(session.id)
     return delete_session_cookies(make_response(jsonify([session.id])))
 
 
@@ -38,3 +39,18 @@ def logout() -> Response:
         return terminate_all_sessions(USER)
 
     return terminate_session(SESSION)
+
+
+@authenticated
+@admin
+def terminate() -> Union[JSON, JSONMessage]:
+    """Terminates all sessions of the given users."""
+
+    try:
+        users = {int(user) for user in request.json["users"]}
+    except KeyError:
+        return JSONMessage("No users specified.", status=400)
+    except (TypeError, ValueError):
+        return JSONMessage("Invalid user ID provided.", status=400)
+
+    return JSON(terminate_user_sessions(*users))
@@ -0,0 +1,54 @@
+"""Mailing lists."""
+
+from flask import request, Response
+
+from wsgilib import JSON, JSONMessage
+
+from cshsso.changefeed import get_delta
+from cshsso.decorators import admin, authenticated
+from cshsso.mailinglist import Targets, get_mailing_lists
+
+
+__all__ = ["show_mailing_list", "show_mailing_list_changes"]
+
+
+CURSOR = "X-Change-Cursor"
+
+
+def get_targets() -> Targets:
+    """Returns the targets from the query parameters."""
+
+    if not (target := request.args.get("target")):
+        raise JSONMessage("No target specified.", status=400)
+
+    try:
+        return Targets.parse(target)
+    except ValueError:
+        raise JSONMessage("Invalid target specified.", status=400) from None
+
+
+@authenticated
+@admin
+def show_mailing_list() -> Response:
+    """Shows the email addresses of a mailing list."""
+
+    mailing_list = get_mailing_lists().get(get_targets())
+    response = Response(mailing_list.json, mimetype="application/json")
+    response.headers[CURSOR] = str(mailing_list.cursor)
+    response.set_etag(mailing_list.etag)
+    return response.make_conditional(request)
+
+
+@authenticated
+@admin
+def show_mailing_list_changes() -> JSON:
+    """Shows the changes of a mailing list since a cursor."""
+
+    try:
+        since = int(request.args["since"])
+    except KeyError:
+        return JSONMessage("No cursor specified.", status=400)
+    except ValueError:
+        return JSONMessage("Invalid cursor specified.", status=400)
+
+    return JSON(get_delta(get_targets(), since).to_json())
@@ -1,19 +1,19 @@
 """Password reset."""
 
+from datetime import datetime
 from typing import Union
 from uuid import UUID
 
 from flask import request
 
-from emaillib import EMail
 from peeweeplus import PasswordTooShort
 from recaptcha import recaptcha
 from wsgilib import JSONMessage
 
 from cshsso.config import CONFIG
-from cshsso.constants import PW_RESET_TEXT
-from cshsso.email import send
-from cshsso.orm.models import PasswordResetToken, User
+from cshsso.constants import PW_RESET_TEXT, PW_RESET_TOKEN_VALIDITY
+from cshsso.orm.models import DATABASE, OutboundEmail, PasswordResetToken, User
+from cshsso.outbox import queue
 
 
 __all__ = ["request_pw_reset", "confirm_pw_reset"]
@@ -26,27 +26,28 @@ RESET_SUCCEEDED = JSONMessage("Reset request successful.", status=200)
 def password_reset_pending(user: Union[User, int]) -> bool:
     """Checks whether a password request is
     already pending for the given user.
-    """
-
-    result = False
 
-    for pw_reset_token in PasswordResetToken.select().where(
-        PasswordResetToken.user == user
-    ):
-        if pw_reset_token.is_valid():
-            result = True
-        else:
-            pw_reset_token.delete_instance()
+    Deletes the user's expired tokens on the way.
+    """
 
-    return result
+    with DATABASE.atomic():
+        PasswordResetToken.delete().where(
+            (PasswordResetToken.user == user)
+            & (PasswordResetToken.issued <= datetime.now() - PW_RESET_TOKEN_VALIDITY)
+        ).execute()
+        return (
+            PasswordResetToken.select()
+            .where(PasswordResetToken.user == user)
+            .exists()
+        )
 
 
-def get_email(
+def queue_email(
     password_reset_token: str, email_address: str, url: str, *, section: str = "pwreset"
-) -> EMail:
-    """Returns an email object."""
+) -> OutboundEmail:
+    """Queues the password reset email."""
 
-    return EMail(
+    return queue(
         CONFIG.get(section, "subject", fallback="Zurücksetzen Ihres Passworts"),
         CONFIG.get(section, "sender", fallback="noreply@cshsso.slesvico-holsatia.org"),
         email_address,
@@ -79,13 +80,12 @@ def request_pw_reset() -> JSONMessage:
     if password_reset_pending(user):
         return JSONMessage("You already requested a password reset.", status=400)
 
-    password_reset_token = PasswordResetToken(user=user)
-    password_reset_token.save()
-
-    if send([get_email(password_reset_token.token.hex, user.email, url)]):
-        return RESET_SUCCEEDED
+    with DATABASE.atomic():
+        password_reset_token = PasswordResetToken(user=user)
+        password_reset_token.save()
+        queue_email(password_reset_token.token.hex, user.email, url)
 
-    return JSONMessage("Could not email reset token.", status=500)
+    return RESET_SUCCEEDED
 
 
 @recaptcha(
@@ -119,7 +119,7 @@ def confirm_pw_reset() -> JSONMessage:
         return JSONMessage("No password specified.", status=400)
 
     try:
-        (user := password_reset_token.user).password = password
+        (user := password_reset_token.user).passwd = password
     except PasswordTooShort:
         return JSONMessage("Password is too short.", status=400)
 
@@ -3,14 +3,14 @@
 from flask import request
 from peewee import IntegrityError
 
-from emaillib import EMail
+from peeweeplus import PasswordTooShort
 from recaptcha import recaptcha
 from wsgilib import JSONMessage
 
 from cshsso.config import CONFIG
 from cshsso.decorators import authenticated, Authorization
-from cshsso.email import send
-from cshsso.orm.models import User
+from cshsso.orm.models import DATABASE, OutboundEmail, User
+from cshsso.outbox import queue
 from cshsso.roles import Status
 
 
@@ -29,10 +29,10 @@ def user_from_json(json: dict) -> User:
     )
 
 
-def get_email(user: User, *, section: str = "registration") -> EMail:
-    """Returns a registration email for the given user."""
+def queue_email(user: User, *, section: str = "registration") -> OutboundEmail:
+    """Queues a registration email for the given user."""
 
-    return EMail(
+    return queue(
         CONFIG.get(section, "subject"),
         CONFIG.get(section, "sender"),
         user.email,
@@ -52,15 +52,18 @@ def register() -> JSONMessage:
         user = user_from_json(request.json)
     except KeyError as error:
         return JSONMessage(str(error), status=400)
+    except PasswordTooShort:
+        return JSONMessage("Password is too short.", status=400)
 
     try:
-        user.save()
+        with DATABASE.atomic():
+            user.save()
+            queue_email(user)
     except ValueError:
         return JSONMessage("Invalid value(s) provided.", status=400)
     except IntegrityError:
         return JSONMessage("User already exists.", status=400)
 
-    send([get_email(user)])
     return JSONMessage("User added.", id=user.id, status=201)
 
 
@@ -0,0 +1,39 @@
+"""Runtime statistics."""
+
+from typing import NamedTuple, Optional
+
+from wsgilib import JSON
+
+from cshsso.decorators import admin, authenticated
+from cshsso.mailinglist import mailing_list_cache_info
+from cshsso.principal import principal_cache_info
+from cshsso.serializer import encoding_cache_info
+from cshsso.session import session_cache_info
+from cshsso.throttle import throttle_info
+from cshsso.usercache import user_cache_info
+
+
+__all__ = ["show_stats"]
+
+
+def to_json_or_none(info: Optional[NamedTuple]) -> Optional[dict]:
+    """Returns the JSON-ish statistics or None."""
+
+    return None if info is None else info.to_json()
+
+
+@authenticated
+@admin
+def show_stats() -> JSON:
+    """Shows cache and throttling statistics."""
+
+    return JSON(
+        {
+            "session_cache": session_cache_info().to_json(),
+            "principal_cache": principal_cache_info().to_json(),
+            "user_cache": user_cache_info().to_json(),
+            "encoding_cache": encoding_cache_info().to_json(),
+            "mailing_list_cache": mailing_list_cache_info().to_json(),
+            "login_throttle": to_json_or_none(throttle_info()),
+        }
+    )
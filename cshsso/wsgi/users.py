@@ -0,0 +1,63 @@
+"""Member directory."""
+
+from typing import Optional
+
+from flask import request, Response
+
+from wsgilib import JSONMessage
+
+from cshsso.decorators import authenticated, Authorization
+from cshsso.directory import Cursor, list_users
+from cshsso.localproxies import ACTOR
+from cshsso.roles import Circle, Commission, CommissionGroup, Status
+from cshsso.serializer import dumps, get_serializer, parse_fields
+
+
+__all__ = ["list_members"]
+
+
+def get_enums(enum: type, key: str) -> set:
+    """Returns the enum members named in the given query parameter."""
+
+    try:
+        return {enum[name] for name in parse_fields(request.args.get(key)) or ()}
+    except KeyError:
+        raise JSONMessage(f"Invalid {key} provided.", status=400) from None
+
+
+def get_cursor() -> Optional[Cursor]:
+    """Returns the cursor from the query parameters."""
+
+    if (after := request.args.get("after")) is None:
+        return None
+
+    try:
+        return Cursor.from_string(after)
+    except ValueError:
+        raise JSONMessage("Invalid cursor provided.", status=400) from None
+
+
+@authenticated
+@Authorization.OUTER
+def list_members() -> Response:
+    """Lists users page by page."""
+
+    serializer = get_serializer(
+        ACTOR.admin, parse_fields(request.args.get("fields"))
+    )
+    page = list_users(
+        status=get_enums(Status, "status"),
+        circles=get_enums(Circle, "circle"),
+        commissions=get_enums(Commission, "commission"),
+        groups=get_enums(CommissionGroup, "group"),
+        after=get_cursor(),
+    )
+    return Response(
+        dumps(
+            {
+                "users": [serializer(user) for user in page.users],
+                "next": None if page.next is None else str(page.next),
+            }
+        ),
+        mimetype="application/json",
+    )
@@ -19,13 +19,27 @@ setup(
         "werkzeug",
         "wsgilib",
     ],
+    extras_require={"orjson": ["orjson"], "redis": ["redis"]},
     author="Corps Slesvico-Holsatia",
     author_email="<cc@slesvico-holsatia.org>",
     maintainer="Richard Neumann",
     maintainer_email="<mail@richard-neumann.de>",
-    packages=["cshsso", "cshsso.orm", "cshsso.orm.functions", "cshsso.wsgi"],
+    packages=[
+        "cshsso",
+        "cshsso.orm",
+        "cshsso.orm.functions",
+        "cshsso.sessionstore",
+        "cshsso.wsgi",
+    ],
     entry_points={
-        "console_scripts": ["cshsso-setup-db = cshsso.install:setup_db"],
+        "console_scripts": [
+            "cshsso-benchmark = cshsso.benchmark:run",
+            "cshsso-import = cshsso.importer:run",
+            "cshsso-mail-worker = cshsso.outbox:run",
+            "cshsso-reap = cshsso.reaper:run",
+            "cshsso-migrate-db = cshsso.install:migrate_db",
+            "cshsso-setup-db = cshsso.install:setup_db",
+        ],
     },
     description="Corps Slesvico-Holsatia Single-Sign-On Framework.",
 )
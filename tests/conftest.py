@@ -0,0 +1,64 @@
+"""Common test fixtures."""
+
+from sys import modules
+
+import pytest
+from argon2 import PasswordHasher
+from peewee import SqliteDatabase
+
+from cshsso.mailinglist import get_mailing_lists
+from cshsso.orm import MODELS
+from cshsso.orm.models import DATABASE
+from cshsso.serializer import get_encodings
+from cshsso.usercache import get_user_cache
+
+
+@pytest.fixture(name="database")
+def fixture_database(monkeypatch):
+    """Binds the models to an empty in-memory database."""
+
+    database = SqliteDatabase(":memory:")
+    cheap = PasswordHasher(time_cost=1, memory_cost=8, parallelism=1)
+    monkeypatch.setattr("cshsso.orm.fields.get_hasher", lambda: cheap)
+
+    # Bind the original locally, since this module is patched as well.
+    original = DATABASE
+
+    for module in list(modules.values()):
+        if getattr(module, "DATABASE", None) is original:
+            monkeypatch.setattr(module, "DATABASE", database)
+
+    for model in MODELS:
+        monkeypatch.setattr(model._meta, "schema", None)
+
+    get_user_cache.cache_clear()
+    get_encodings.cache_clear()
+    get_mailing_lists.cache_clear()
+
+    with database.bind_ctx(MODELS):
+        database.create_tables(MODELS)
+        yield database
+
+
+@pytest.fixture(name="count_queries")
+def fixture_count_queries(database):
+    """Returns a function counting the queries run by a function."""
+
+    def count_queries(function) -> int:
+        queries = []
+        execute_sql = database.execute_sql
+
+        def record(sql, *args, **kwargs):
+            queries.append(sql)
+            return execute_sql(sql, *args, **kwargs)
+
+        database.execute_sql = record
+
+        try:
+            function()
+        finally:
+            del database.execute_sql
+
+        return len(queries)
+
+    return count_queries
@@ -0,0 +1,62 @@
+"""Tests of the authorization checks."""
+
+from itertools import product
+
+from cshsso.authorization import check_convent
+from cshsso.convents import ConventAuth
+from cshsso.decorators import Authorization
+from cshsso.orm.models import User, UserCommission
+from cshsso.roles import Commission, Status
+
+
+def legacy_check(authorization: Authorization, user: User) -> bool:
+    """Returns the result of the check before it was compiled to bitmasks."""
+
+    if authorization is Authorization.AHC:
+        return user.status in {Status.AH, Status.EB, Status.BBZ} or bool(
+            user.has_commission(Commission.SENIOR)
+        )
+
+    if authorization is Authorization.FC_VOTE:
+        return user.status in {Status.F, Status.EB} or bool(
+            user.has_commission(Commission.FM)
+        )
+
+    return authorization.value(user)
+
+
+def test_compiled_checks_equal_legacy_checks(database):
+    """Compiled checks agree with the legacy checks for all roles."""
+
+    user = User.create(
+        email="hans.fuchs@example.com",
+        passwd="correct horse battery staple",
+        first_name="Hans",
+        last_name="Fuchs",
+        status=Status.CB,
+    )
+    assert len(Authorization) == 13
+
+    for status, commission in product(Status, [None, *Commission]):
+        UserCommission.delete().execute()
+
+        if commission is not None:
+            UserCommission.create(occupant=user, commission=commission)
+
+        user = User.get_by_id(user.id)
+        user.user_commissions = list(user.user_commissions)
+        user.status = status
+
+        for authorization in Authorization:
+            expected = legacy_check(authorization, user)
+            assert authorization.check(user) is expected, (status, commission)
+            assert authorization.value(user) is expected, (status, commission)
+
+
+def test_convent_checks_do_not_query():
+    """Convent checks only use the loaded commissions of unbound users."""
+
+    user = User(id=1, status=Status.CB)
+    user.user_commissions = [UserCommission(occupant=1, commission=Commission.SENIOR)]
+    assert check_convent(user, ConventAuth.AHC)
+    assert not check_convent(user, ConventAuth.FC_VOTE)
@@ -0,0 +1,68 @@
+"""Tests of the mailing list change log."""
+
+import pytest
+
+from cshsso.changefeed import state_from_fields
+from cshsso.orm.models import MailingListChange, User, UserCommission
+from cshsso.roles import Commission, Status
+
+
+def create_user(email: str) -> User:
+    """Creates a user with the given email address."""
+
+    return User.create(
+        email=email,
+        passwd="correct horse battery staple",
+        first_name="Hans",
+        last_name="Fuchs",
+        status=Status.CB,
+    )
+
+
+def get_changes() -> list[MailingListChange]:
+    """Returns the logged changes in order."""
+
+    return list(MailingListChange.select().order_by(MailingListChange.id))
+
+
+def test_changes_are_rolled_back(database):
+    """Changes are logged in the transaction of the change."""
+
+    with pytest.raises(RuntimeError):
+        with database.atomic():
+            create_user("hans.fuchs@example.com")
+            assert len(get_changes()) == 1
+            raise RuntimeError()
+
+    assert not get_changes()
+
+
+def test_moved_commission_is_logged(database):
+    """Updating a commission logs the loss of its previous occupant."""
+
+    first = create_user("hans.fuchs@example.com")
+    second = create_user("fritz.fuchs@example.com")
+    user_commission = UserCommission.create(occupant=first, commission=Commission.FM)
+    user_commission.occupant = second
+    user_commission.save()
+
+    lost, gained = get_changes()[-2:]
+    assert lost.user == first.id
+    assert state_from_fields(lost, "old").commissions == {Commission.FM}
+    assert state_from_fields(lost, "new").commissions == set()
+    assert gained.user == second.id
+    assert state_from_fields(gained, "old").commissions == set()
+    assert state_from_fields(gained, "new").commissions == {Commission.FM}
+
+
+def test_changed_commission_is_logged(database):
+    """Replacing a commission logs the previous one as old state."""
+
+    user = create_user("hans.fuchs@example.com")
+    user_commission = UserCommission.create(occupant=user, commission=Commission.FM)
+    user_commission.commission = Commission.SENIOR
+    user_commission.save()
+
+    change = get_changes()[-1]
+    assert state_from_fields(change, "old").commissions == {Commission.FM}
+    assert state_from_fields(change, "new").commissions == {Commission.SENIOR}
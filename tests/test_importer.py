@@ -0,0 +1,42 @@
+"""Tests of the bulk import of users."""
+
+from peewee import DataError
+
+from cshsso.importer import insert_batch, parse_records
+from cshsso.orm.models import User
+
+
+RECORD = {
+    "email": "hans.fuchs@example.com",
+    "passwd": "correct horse battery staple",
+    "first_name": "Hans",
+    "last_name": "Fuchs",
+    "status": "CB",
+    "commissions": ["FM"],
+}
+
+
+def test_short_passwords_are_skipped():
+    """Records with too short passwords are not imported."""
+
+    records = [RECORD, {**RECORD, "passwd": "short"}]
+    assert [record.row for record in parse_records(records, verified=False)] == [1]
+
+
+def test_invalid_rows_are_skipped(database):
+    """Rows rejected by the database do not abort their batch."""
+
+    first, second = parse_records(
+        [RECORD, {**RECORD, "email": "fritz.fuchs@example.com", "commissions": []}],
+        verified=False,
+    )
+
+    for record in (first, second):
+        record.user.passwd = record.passwd
+
+    def save(*_, **__):
+        raise DataError("Data too long for column 'first_name'")
+
+    first.user.save = save
+    assert insert_batch([first, second], dry_run=False) == 1
+    assert [user.email for user in User.select()] == ["fritz.fuchs@example.com"]
@@ -0,0 +1,25 @@
+"""Tests of the database upgrade."""
+
+from playhouse.migrate import SchemaMigrator, migrate
+
+from cshsso.install import upgrade
+
+
+def test_upgrade_adds_missing_columns_and_indexes(database):
+    """Columns and indexes missing in older databases are added."""
+
+    migrator = SchemaMigrator.from_database(database)
+    migrate(
+        migrator.drop_index("user", "user_status_corps_list_number_id"),
+        migrator.drop_index("session", "session_valid_until"),
+        migrator.drop_column("user", "revision"),
+    )
+
+    assert upgrade(database, dry_run=True) == [
+        "Add column user.revision.",
+        "Add index on user(status, corps_list_number, id).",
+        "Add index on session(valid_until).",
+    ]
+    assert len(upgrade(database)) == 3
+    assert upgrade(database) == []
+    assert "revision" in {column.name for column in database.get_columns("user")}
@@ -0,0 +1,37 @@
+"""Tests of the configured keys."""
+
+from configparser import ConfigParser
+
+import pytest
+
+from cshsso.orm.fields import get_secret_key
+
+
+@pytest.fixture(name="config")
+def fixture_config(monkeypatch):
+    """Returns an empty configuration."""
+
+    config = ConfigParser()
+    monkeypatch.setattr("cshsso.orm.fields.CONFIG", config)
+    get_secret_key.cache_clear()
+    yield config
+    get_secret_key.cache_clear()
+
+
+def test_missing_secret_key(config):
+    """A missing secret key is reported clearly."""
+
+    with pytest.raises(ValueError, match=r"secret_key .* \[session\]"):
+        get_secret_key()
+
+    config.read_dict({"session": {"secret_key": "not base64!"}})
+
+    with pytest.raises(ValueError, match="Invalid base64"):
+        get_secret_key()
+
+
+def test_secret_key(config):
+    """The secret key is decoded from base64."""
+
+    config.read_dict({"session": {"secret_key": "c2VjcmV0"}})
+    assert get_secret_key() == b"secret"
@@ -0,0 +1,32 @@
+"""Tests of the mailing list cache."""
+
+from cshsso.mailinglist import get_mailing_list
+from cshsso.orm.models import MailingListChange, User
+from cshsso.roles import Status
+
+
+def test_changes_of_other_processes_are_seen(database):
+    """Logged changes that bypassed this process' hooks reload the list."""
+
+    user = User.create(
+        email="hans.fuchs@example.com",
+        passwd="correct horse battery staple",
+        first_name="Hans",
+        last_name="Fuchs",
+        status=Status.CB,
+    )
+    assert get_mailing_list(Status.CB).emails == ("hans.fuchs@example.com",)
+    assert get_mailing_list(Status.CB).emails == ("hans.fuchs@example.com",)
+
+    # Changes of other processes do not run this process' hooks.
+    User.update(status=Status.AH).where(User.id == user.id).execute()
+    MailingListChange.create(
+        user=user.id,
+        old_email=user.email,
+        old_status=Status.CB,
+        old_commissions=0,
+        new_email=user.email,
+        new_status=Status.AH,
+        new_commissions=0,
+    )
+    assert get_mailing_list(Status.CB).emails == ()
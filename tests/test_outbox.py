@@ -0,0 +1,97 @@
+"""Tests of the outbox worker."""
+
+from datetime import datetime
+from functools import partial
+from smtplib import SMTP
+from socket import socket
+
+import pytest
+from peewee import ModelSelect, OperationalError
+
+from cshsso import outbox
+from cshsso.benchmark import start_sink
+from cshsso.email import SMTPPool
+from cshsso.orm.models import OutboundEmail
+from cshsso.outbox import OutboxSettings, process, queue, work
+
+
+SETTINGS = OutboxSettings(
+    batch_size=10, interval=0, max_attempts=3, backoff=30, max_backoff=60
+)
+
+
+@pytest.fixture(name="outbox_database")
+def fixture_outbox_database(database, monkeypatch):
+    """Returns the database, ignoring row locks unsupported by SQLite."""
+
+    monkeypatch.setattr(ModelSelect, "for_update", lambda self, *_, **__: self)
+    return database
+
+
+def use_server(monkeypatch, host: str, port: int) -> None:
+    """Sends emails of the outbox to the given SMTP server."""
+
+    pool = SMTPPool(partial(SMTP, host, port, timeout=5))
+    monkeypatch.setattr(outbox, "get_smtp_pool", lambda: pool)
+
+
+def queue_emails(amount: int) -> list[OutboundEmail]:
+    """Queues the given amount of emails."""
+
+    return [
+        queue("Test", "sender@localhost", f"member{index}@localhost", plain="Hi.")
+        for index in range(amount)
+    ]
+
+
+def test_emails_are_sent(outbox_database, monkeypatch):
+    """Queued emails are sent and marked as sent."""
+
+    server = start_sink()
+    use_server(monkeypatch, *server.server_address)
+
+    try:
+        queue_emails(3)
+        assert process(SETTINGS) == 3
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    for outbound_email in OutboundEmail.select():
+        assert outbound_email.sent is not None
+        assert outbound_email.attempts == 1
+
+    assert process(SETTINGS) == 0
+
+
+def test_unreachable_server_postpones_emails(outbox_database, monkeypatch):
+    """Emails are postponed without counting attempts if the server is down."""
+
+    with socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    use_server(monkeypatch, "127.0.0.1", port)
+    queue_emails(2)
+    assert process(SETTINGS) == 0
+
+    for outbound_email in OutboundEmail.select():
+        assert outbound_email.sent is None
+        assert outbound_email.attempts == 0
+        assert outbound_email.due > datetime.now()
+
+
+def test_worker_survives_database_errors(database, monkeypatch):
+    """The worker logs database errors and carries on."""
+
+    results = [OperationalError("server has gone away"), 0]
+
+    def process_batch(_):
+        if isinstance(result := results.pop(0), Exception):
+            raise result
+
+        return result
+
+    monkeypatch.setattr(outbox, "process", process_batch)
+    work(SETTINGS, once=True)
+    assert not results
@@ -0,0 +1,57 @@
+"""Property tests of the SQL eligibility conditions."""
+
+import pytest
+
+from cshsso.authorization import check_circle, check_convent, check_group
+from cshsso.convents import ConventAuth
+from cshsso.orm.models import User, UserCommission
+from cshsso.roles import Circle, Commission, CommissionGroup, Status
+from cshsso.roster import get_eligible_users
+
+
+CHECKS = [
+    *((circle, check_circle) for circle in Circle),
+    *((group, check_group) for group in CommissionGroup),
+    *((convent, check_convent) for convent in ConventAuth),
+]
+
+
+@pytest.fixture(name="users")
+def fixture_users(database):
+    """Returns one user per status."""
+
+    return {
+        status: User.create(
+            email=f"{status._name_.lower()}@example.com",
+            passwd="correct horse battery staple",
+            first_name="Hans",
+            last_name="Fuchs",
+            status=status,
+        )
+        for status in Status
+    }
+
+
+@pytest.mark.parametrize("commission", [None, *Commission])
+def test_sql_matches_python(users, commission):
+    """SQL conditions agree with the Python checks
+    for every status with every or no commission.
+    """
+
+    for status, user in users.items():
+        UserCommission.delete().execute()
+
+        if commission is not None:
+            UserCommission.create(occupant=user, commission=commission)
+
+        loaded = User.get_by_id(user.id)
+
+        for check, python_check in CHECKS:
+            eligible = (
+                get_eligible_users(check, User.id).where(User.id == user.id).exists()
+            )
+            assert eligible == bool(python_check(loaded, check)), (
+                status,
+                commission,
+                check,
+            )
@@ -0,0 +1,174 @@
+"""Tests of the session stores."""
+
+from datetime import datetime, timedelta
+from shutil import which
+from socket import socket
+from subprocess import DEVNULL, Popen
+from time import sleep
+
+import pytest
+from argon2.exceptions import VerifyMismatchError
+
+from cshsso.exceptions import NotLoggedIn
+from cshsso.orm.models import Session, User
+from cshsso.roles import Status
+from cshsso.sessionstore import MemoryStore
+
+
+@pytest.fixture(name="redis_url", scope="module")
+def fixture_redis_url():
+    """Runs a throwaway Redis-compatible server and returns its URL."""
+
+    redis = pytest.importorskip("redis")
+
+    if (server := which("redis-server") or which("valkey-server")) is None:
+        pytest.skip("No Redis-compatible server installed.")
+
+    with socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    url = f"redis://127.0.0.1:{port}/0"
+    process = Popen(
+        [server, "--port", str(port), "--save", "", "--appendonly", "no"],
+        stdout=DEVNULL,
+    )
+
+    try:
+        client = redis.Redis.from_url(url)
+
+        for _ in range(50):
+            try:
+                client.ping()
+                break
+            except redis.ConnectionError:
+                sleep(0.1)
+
+        yield url
+    finally:
+        process.terminate()
+        process.wait()
+
+
+@pytest.fixture(name="store", params=["memory", "keyvalue"])
+def fixture_store(request, database, monkeypatch):
+    """Returns an empty session store."""
+
+    monkeypatch.setattr("cshsso.orm.fields.get_secret_key", lambda: b"secret")
+
+    if request.param == "memory":
+        return MemoryStore()
+
+    url = request.getfixturevalue("redis_url")
+    # Optional dependency, only import when the server is available.
+    from cshsso.sessionstore.keyvalue import KeyValueStore
+
+    store = KeyValueStore(url)
+    store.client.flushdb()
+    return store
+
+
+@pytest.fixture(name="user")
+def fixture_user(database):
+    """Returns a stored user."""
+
+    return User.create(
+        email="hans.fuchs@example.com",
+        passwd="correct horse battery staple",
+        first_name="Hans",
+        last_name="Fuchs",
+        status=Status.CB,
+    )
+
+
+def add_session(store, user: User, secret: str = "s3cr3t", **kwargs) -> Session:
+    """Adds a session of the user to the store."""
+
+    return store.add(Session(user=user, secret=secret, **kwargs))
+
+
+def test_session_round_trip(store, user):
+    """Stored sessions are restored with their user and secret."""
+
+    session = add_session(store, user)
+    restored = store.get(session.id)
+    assert restored.user.id == user.id
+    assert restored.secret.verify("s3cr3t")
+    assert restored.valid_until.replace(microsecond=0) == session.valid_until.replace(
+        microsecond=0
+    )
+
+
+def test_session_ids_are_unique(store, user):
+    """Each session is assigned a new ID."""
+
+    assert add_session(store, user).id != add_session(store, user).id
+
+
+def test_missing_session(store, user):
+    """Unknown sessions and sessions of deleted users are rejected."""
+
+    with pytest.raises(NotLoggedIn):
+        store.get(42)
+
+    session = add_session(store, user)
+    user.delete_instance()
+
+    with pytest.raises(NotLoggedIn):
+        store.get(session.id)
+
+
+def test_extend(store, user):
+    """Extending sets the expiry, but does not restore deleted sessions."""
+
+    session = add_session(store, user)
+    deleted = add_session(store, user)
+    store.delete(deleted.id)
+    valid_until = datetime.now().replace(microsecond=0) + timedelta(days=2)
+    store.extend({session.id: valid_until, deleted.id: valid_until})
+    assert store.get(session.id).valid_until == valid_until
+
+    with pytest.raises(NotLoggedIn):
+        store.get(deleted.id)
+
+
+def test_save_secret(store, user):
+    """Changed secrets replace the stored ones."""
+
+    session = add_session(store, user)
+    session.secret = "n3w"
+    store.save_secret(session)
+    restored = store.get(session.id)
+    assert restored.secret.verify("n3w")
+
+    with pytest.raises(VerifyMismatchError):
+        restored.secret.verify("s3cr3t")
+
+
+def test_delete_for_users(store, user):
+    """All sessions of a user are deleted at once."""
+
+    sessions = [add_session(store, user), add_session(store, user)]
+    assert store.delete_for_user(user) == sorted(session.id for session in sessions)
+    assert store.delete_for_user(user) == []
+
+    for session in sessions:
+        with pytest.raises(NotLoggedIn):
+            store.get(session.id)
+
+
+def test_purge(store, user):
+    """Expired sessions are purged."""
+
+    add_session(store, user)
+    add_session(store, user, valid_until=datetime.now() - timedelta(seconds=1))
+    assert store.purge() == 1
+    assert len(store.delete_for_user(user)) == 1
+
+
+def test_cached_user_is_loaded_cheaply(store, user, count_queries):
+    """Restoring a session of a cached user checks only its revision."""
+
+    session = add_session(store, user)
+    store.get(session.id)
+    assert count_queries(lambda: store.get(session.id)) == 1
@@ -0,0 +1,44 @@
+"""Tests of stateless session tokens."""
+
+from cshsso.orm.models import User, UserCommission
+from cshsso.roles import Commission, Status
+from cshsso.tokens import TokenClaims
+
+
+def make_user(status: Status, *commissions: Commission) -> User:
+    """Returns an unsaved user with the given roles."""
+
+    user = User(id=1, status=status, admin=False, permissions_version=3)
+    user.user_commissions = [
+        UserCommission(occupant=1, commission=commission) for commission in commissions
+    ]
+    return user
+
+
+def test_claims_round_trip():
+    """Claims restore the user's status and commissions."""
+
+    for status in Status:
+        user = make_user(status, Commission.SENIOR, Commission.AHV_STELLV)
+        restored = TokenClaims.for_user(user).to_user()
+        assert restored.id == user.id
+        assert restored.status is status
+        assert restored.commissions == user.commissions
+        assert restored.admin == user.admin
+        assert restored.permissions_version == user.permissions_version
+
+
+def test_claims_use_member_names():
+    """Claims carry enum member names rather than display names."""
+
+    claims = TokenClaims.for_user(make_user(Status.CB, Commission.FM))
+    assert claims.status == "CB"
+    assert claims.commissions == ["FM"]
+
+
+def test_refreshed_claims_keep_token_id():
+    """Refreshed claims keep the ID of the token they replace."""
+
+    user = make_user(Status.CB)
+    claims = TokenClaims.for_user(user)
+    assert TokenClaims.for_user(user, claims.id).id == claims.id
@@ -0,0 +1,68 @@
+"""Tests of the user cache."""
+
+import pytest
+
+from cshsso.orm.functions import get_user
+from cshsso.orm.models import User, UserCommission
+from cshsso.roles import Commission, Status
+from cshsso.serializer import get_serializer
+
+
+@pytest.fixture(name="user")
+def fixture_user(database):
+    """Returns a stored user."""
+
+    return User.create(
+        email="hans.fuchs@example.com",
+        passwd="correct horse battery staple",
+        first_name="Hans",
+        last_name="Fuchs",
+        status=Status.CB,
+    )
+
+
+def test_cached_user_is_served(user, count_queries):
+    """An unchanged user is served with one query."""
+
+    get_user(user.id)
+    assert count_queries(lambda: get_user(user.id)) == 1
+
+
+def test_changes_of_other_processes_are_seen(user):
+    """Changes that did not pass this process' cache are detected."""
+
+    assert get_user(user.id).first_name == "Hans"
+    User.update(first_name="Fritz", revision=User.revision + 1).where(
+        User.id == user.id
+    ).execute()
+    assert get_user(user.id).first_name == "Fritz"
+
+
+def test_commission_changes_are_seen(user):
+    """Added commissions invalidate the cached user."""
+
+    assert get_user(user.id).commissions == set()
+    UserCommission.create(occupant=user, commission=Commission.FM)
+    assert get_user(user.id).commissions == {Commission.FM}
+
+
+def test_missing_users_are_cached(count_queries):
+    """Missing users are not looked up again."""
+
+    def lookup():
+        with pytest.raises(User.DoesNotExist):
+            get_user(42)
+
+    lookup()
+    assert count_queries(lookup) == 0
+
+
+def test_encodings_are_reused(user):
+    """Encodings of unchanged users are reused across lookups."""
+
+    serializer = get_serializer(True)
+    encoded = serializer.encode(get_user(user.id))
+    assert serializer.encode(get_user(user.id)) is encoded
+    user.first_name = "Fritz"
+    user.save()
+    assert b"Fritz" in serializer.encode(get_user(user.id))